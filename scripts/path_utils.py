@@ -63,6 +63,10 @@ def get_exclusive_paths(panes: list[Pane]) -> list[tuple[Pane, Path]]:
     # Start all displays as the last dir (.name)
     exc_paths = [DisplayedPath.from_pane(pane) for pane in panes]
 
+    # Nothing to disambiguate when every last dir is already unique (including 0 or 1 panes)
+    if len({p.display for p in exc_paths}) == len(exc_paths):
+        return [(p.pane, p.display) for p in exc_paths]
+
     for x in range(len(exc_paths)):
         intersected_paths = []
         same_paths_different_programs = []
@@ -6,20 +6,23 @@ __all__ = [
 ]
 
 import ast
+import copy
 import dataclasses
 import json
 import logging
-import logging.config
+import os
 import re
 import subprocess
+import sys
 import tempfile
 from argparse import ArgumentParser
-from collections.abc import Iterator
+from collections.abc import Callable, Collection, Iterator, Sequence
 from contextlib import contextmanager
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Any, Optional, cast
+from types import SimpleNamespace
+from typing import Any, NamedTuple, Optional, TypeVar, Union, cast
 
 from libtmux.pane import Pane as TmuxPane
 from libtmux.server import Server
@@ -30,7 +33,30 @@ from scripts.path_utils import Pane, get_exclusive_paths
 OPTIONS_PREFIX = '@tmux_window_name_'
 HOOK_INDEX = 8921
 HOME_DIR = str(Path.home())
+_HOME_PREFIX = f'{HOME_DIR}/'
+PROC_DIR = Path('/proc')
+_SESSION_CACHE_ATTR = '_tmux_window_name_session'
+# Escape single quotes in the file path to prevent command injection
+_CURRENT_FILE_ESCAPED = str(Path(__file__).absolute()).replace("'", "'\\''")
+_RENAME_HOOK_COMMAND = (
+    'if-shell "[ #{n:window_name} -gt 0 ]" '
+    '"set -w @tmux_window_name_enabled 0" '
+    f'"set -w @tmux_window_name_enabled 1; run-shell \'{_CURRENT_FILE_ESCAPED}\'"'
+)
+# Path goes last so it's the only field that may contain tabs
+ACTIVE_PANES_FORMAT = '\t'.join(
+    ('#{pane_active}', '#{window_id}', '#{pane_id}', '#{pane_pid}', '#{pane_current_command}', '#{pane_current_path}')
+)
 USR_BIN_REMOVER = (r'^(/usr)?/bin/(.+)', r'\g<2>')
+_USR_BIN_REMOVER_RE = re.compile(USR_BIN_REMOVER[0])
+# Our own `python scripts/rename_session_windows.py` process shows up as a child of the pane's shell
+_SCRIPT_MARKER = b'scripts/rename_session_windows.py'
+_USR_BIN_REMOVER_BYTES_RE = re.compile(USR_BIN_REMOVER[0].encode())
+_USR_BIN_REMOVER_BYTES_REPL = USR_BIN_REMOVER[1].encode()
+
+# `show-options` escapes values the same way vis(3) does, e.g: "a\"b", \~/dir, a\tb
+_TMUX_ESCAPE_RE = re.compile(r'\\([0-7]{3}|.)', re.DOTALL)
+_TMUX_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
 
 # Nerd font icons for common programs
 # Source for icons: https://www.nerdfonts.com/cheat-sheet
@@ -65,10 +91,24 @@ def get_option(server: Server, option: str, default: Any) -> Any:
     if len(out) == 0:
         return default
 
-    value = out[0]
+    return _parse_option_value(option, out[0])
+
+
+def _parse_option_value(option: str, value: str) -> Any:
+    return _OPTION_PARSERS.get(option, _parse_literal)(value)
+
+
+# Identifiers json or ast.literal_eval turn into values, every other identifier fails both parsers
+_LITERAL_WORDS = frozenset({'True', 'False', 'None', 'true', 'false', 'null', 'NaN', 'Infinity'})
 
-    # Special handling for icon_style - it's a plain string
-    if option == 'icon_style':
+
+def _is_plain_word(value: str) -> bool:
+    """Check for words that no literal parser accepts, so they can be kept as-is without raising and catching"""
+    return value.isidentifier() and value not in _LITERAL_WORDS
+
+
+def _parse_literal(value: str) -> Any:
+    if _is_plain_word(value):
         return value
 
     # Try to parse as JSON first (safer than eval)
@@ -87,6 +127,38 @@ def get_option(server: Server, option: str, default: Any) -> Any:
     return value
 
 
+def _unescape_tmux_value(value: str) -> str:
+    """Undo the quoting `show-options` applies to values, `show-option -v` would print them raw"""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        value = value[1:-1]
+
+    return _TMUX_ESCAPE_RE.sub(_unescape_match, value)
+
+
+def _unescape_match(match: re.Match[str]) -> str:
+    escaped = match[1]
+    # Octal escape of a non printable character
+    if len(escaped) == 3:
+        return chr(int(escaped, 8))
+
+    return _TMUX_ESCAPES.get(escaped, escaped)
+
+
+def _load_all_options(server: Server) -> dict[str, str]:
+    """Read every global `@tmux_window_name_*` option with a single tmux call
+
+    Returns:
+        Raw option values keyed by the option name without OPTIONS_PREFIX
+    """
+    options = {}
+    for line in server.cmd('show-options', '-g').stdout:
+        name, _, value = line.partition(' ')
+        if name.startswith(OPTIONS_PREFIX):
+            options[name[len(OPTIONS_PREFIX) :]] = _unescape_tmux_value(value)
+
+    return options
+
+
 def set_option(server: Server, option: str, val: str):
     server.cmd('set-option', '-g', f'{OPTIONS_PREFIX}{option}', val)
 
@@ -98,20 +170,18 @@ def get_window_option(server: Server, window_id: Optional[str], option: str, def
 def get_window_tmux_option(
     server: Server, window_id: Optional[str], option: str, default: Any, do_eval: bool = False
 ) -> Any:
-    arguments = ['show-option', '-wqv']
-
     if window_id is not None:
-        arguments.append('-t')
-        arguments.append(window_id)
-
-    arguments.append(option)
-    out = server.cmd(*arguments).stdout
+        out = server.cmd('show-option', '-wqv', '-t', window_id, option).stdout
+    else:
+        out = server.cmd('show-option', '-wqv', option).stdout
 
     if len(out) == 0:
         return default
 
     if do_eval:
         value = out[0]
+        if _is_plain_word(value):
+            return value
         # Use ast.literal_eval for safe evaluation
         try:
             return ast.literal_eval(value)
@@ -122,28 +192,58 @@ def get_window_tmux_option(
     return out[0]
 
 
-def set_window_tmux_option(server: Server, window_id: Optional[str], option: str, value: str) -> Any:
-    arguments = ['set-option', '-wq']
-    if window_id is not None:
-        arguments.append('-t')
-        arguments.append(window_id)
+class WindowState(NamedTuple):
+    # Raw @tmux_window_name_enabled value, empty when the option is unset
+    enabled: str
+    # Current name when automatic-rename is on and keeps it, renaming the window to it again changes nothing
+    settled_name: Optional[str]
+
+
+# Windows missing from the listing are renamed like enabled windows
+_DEFAULT_WINDOW_STATE = WindowState('1', None)
+WINDOWS_STATE_FORMAT = ' '.join(
+    (
+        '#{window_id}',
+        '#{&&:#{automatic-rename},#{==:#{window_name},#{automatic-rename-format}}}',
+        f'#{{{OPTIONS_PREFIX}enabled}}',
+        # Name goes last so it's the only field that may contain spaces
+        '#{window_name}',
+    )
+)
+
 
-    arguments.append(option)
-    arguments.append(value)
+def _load_windows_state(server: Server) -> dict[str, WindowState]:
+    """Read @tmux_window_name_enabled and the current name of every window with a single tmux call
+
+    Returns:
+        WindowState keyed by window id
+    """
+    windows_state = {}
+    for line in server.cmd('list-windows', '-a', '-F', WINDOWS_STATE_FORMAT).stdout:
+        window_id, settled, enabled, window_name = (line.split(' ', 3) + ['', '', ''])[:4]
+        windows_state[window_id] = WindowState(enabled, window_name if settled == '1' else None)
+
+    return windows_state
 
-    server.cmd(*arguments)
+
+def set_window_tmux_option(server: Server, window_id: Optional[str], option: str, value: str) -> Any:
+    if window_id is not None:
+        server.cmd('set-option', '-wq', '-t', window_id, option, value)
+    else:
+        server.cmd('set-option', '-wq', option, value)
 
 
 def post_restore(server: Server):
-    # Re enable tmux-window-name if `automatic-rename` is on
-    for window in server.windows:
-        if get_window_tmux_option(server, window.window_id, 'automatic-rename', 'on') == 'on':
-            set_window_tmux_option(server, window.window_id, f'{OPTIONS_PREFIX}enabled', '1')
-        else:
-            set_window_tmux_option(server, window.window_id, f'{OPTIONS_PREFIX}enabled', '0')
+    # Re enable tmux-window-name if `automatic-rename` is on, read and written for all windows at once
+    commands = []
+    for line in server.cmd('list-windows', '-a', '-F', '#{window_id} #{automatic-rename}').stdout:
+        window_id, _, automatic_rename = line.partition(' ')
+        enabled = '0' if automatic_rename == '0' else '1'
+        commands.append(f'set-option -wq -t {window_id} {OPTIONS_PREFIX}enabled {enabled}')
 
     # Enable rename hook to enable tmux-window-name on later windows
-    enable_user_rename_hook(server)
+    commands.append(_enable_rename_hook_command())
+    source_tmux_commands(server, commands)
 
 
 def enable_user_rename_hook(server: Server):
@@ -157,38 +257,46 @@ def enable_user_rename_hook(server: Server):
     @tmux_window_name_enabled (window option):
         Indicator if we should rename the window or not
     """
-    current_file = str(Path(__file__).absolute())
-    # Escape single quotes in the file path to prevent command injection
-    current_file_escaped = current_file.replace("'", "'\\''")
-    server.cmd(
-        'set-hook',
-        '-g',
-        f'after-rename-window[{HOOK_INDEX}]',
-        'if-shell "[ #{n:window_name} -gt 0 ]" '
-        '"set -w @tmux_window_name_enabled 0" '
-        f'"set -w @tmux_window_name_enabled 1; run-shell \'{current_file_escaped}\'"',
-    )
+    server.cmd('set-hook', '-g', f'after-rename-window[{HOOK_INDEX}]', _RENAME_HOOK_COMMAND)
 
 
 def disable_user_rename_hook(server: Server):
     server.cmd('set-hook', '-ug', f'after-rename-window[{HOOK_INDEX}]')
 
 
+def _enable_rename_hook_command() -> str:
+    """`enable_user_rename_hook` as a line for `source_tmux_commands`"""
+    return f'set-hook -g after-rename-window[{HOOK_INDEX}] {quote_tmux_argument(_RENAME_HOOK_COMMAND)}'
+
+
+def _set_option_command(option: str, val: str) -> str:
+    """`set_option` as a line for `source_tmux_commands`"""
+    return f'set-option -g {OPTIONS_PREFIX}{option} {quote_tmux_argument(val)}'
+
+
 @contextmanager
 def tmux_guard(server: Server) -> Iterator[bool]:
     already_running = bool(get_option(server, 'running', 0))
 
     try:
         if not already_running:
-            set_option(server, 'running', '1')
-            disable_user_rename_hook(server)
+            # Mark running and disable the hook with one tmux call
+            source_tmux_commands(
+                server, [_set_option_command('running', '1'), f'set-hook -ug after-rename-window[{HOOK_INDEX}]']
+            )
 
         # Yield True when a previous invocation is already running to avoid re-entry
         yield already_running
     finally:
         if not already_running:
-            enable_user_rename_hook(server)
-            set_option(server, 'running', '0')
+            source_tmux_commands(server, [_enable_rename_hook_command(), _set_option_command('running', '0')])
+
+
+class CompiledSubstitution(NamedTuple):
+    pattern: re.Pattern[str]
+    replacement: str
+    # Literal text every match must contain, names without it are skipped without running the regex
+    required: str
 
 
 class IconStyle(str, Enum):
@@ -197,6 +305,10 @@ class IconStyle(str, Enum):
     NAME_AND_ICON = 'name_and_icon'
 
 
+_S = TypeVar('_S')
+_T = TypeVar('_T')
+
+
 @dataclass
 class Options:
     shells: list[str] = field(default_factory=lambda: ['bash', 'fish', 'sh', 'zsh'])
@@ -217,23 +329,50 @@ class Options:
     dir_substitute_sets: list[tuple[str, str]] = field(default_factory=list)
     show_program_args: bool = True
     log_level: str = 'WARNING'
+    # Values derived from other fields, with a copy of the field contents they were built from, see `_derived`
+    _derived_cache: dict[str, tuple[Any, Any]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def _derived(self, name: str, source: _S, build: Callable[[_S], _T]) -> _T:
+        """Build a value derived from the field value `source` once, again only after the field changes
+
+        Fields may be reassigned or mutated in place after construction, a copy of `source` is kept to compare with.
+        """
+        cached = self._derived_cache.get(name)
+        if cached is None or cached[0] != source:
+            cached = (copy.deepcopy(source), build(source))
+            self._derived_cache[name] = cached
+        return cast('_T', cached[1])
+
+    # Compiled once so the per-pane substitutions don't go through `re`'s pattern cache
+    @property
+    def compiled_substitute_sets(self) -> list[CompiledSubstitution]:
+        return self._derived('compiled_substitute_sets', self.substitute_sets, compile_substitute_sets)
+
+    @property
+    def compiled_dir_substitute_sets(self) -> list[CompiledSubstitution]:
+        return self._derived('compiled_dir_substitute_sets', self.dir_substitute_sets, compile_substitute_sets)
+
+    @property
+    def dir_programs_set(self) -> frozenset[str]:
+        """Set of dir_programs, checked once per pane"""
+        return self._derived('dir_programs_set', self.dir_programs, frozenset)
+
+    @property
+    def icon_map(self) -> Optional[dict[str, str]]:
+        """Built-in icons merged with custom_icons and decoded, None when custom_icons isn't a dict of strings"""
+        return self._derived('icon_map', self.custom_icons, build_icon_map)
 
     @staticmethod
     def from_options(server: Server):
-        fields = Options.__dataclass_fields__
-
-        def default_field_value(field_info):
-            # field_info is a Field object from dataclasses
-            if hasattr(field_info, 'default_factory') and field_info.default_factory is not dataclasses.MISSING:
-                return field_info.default_factory()
-            if hasattr(field_info, 'default') and field_info.default is not dataclasses.MISSING:
-                return field_info.default
-            return None
+        all_options = _load_all_options(server)
 
-        fields_values = {
-            field_name: get_option(server, field_name, default_field_value(field_info))
-            for field_name, field_info in fields.items()
-        }
+        fields_values = {}
+        for field_info in _OPTION_FIELDS:
+            raw = all_options.get(field_info.name)
+            if raw is None:
+                fields_values[field_info.name] = default_field_value(field_info)
+            else:
+                fields_values[field_info.name] = _OPTION_PARSERS[field_info.name](raw)
 
         # Convert icon_style from string to enum if it's a string
         if 'icon_style' in fields_values and isinstance(fields_values['icon_style'], str):
@@ -246,6 +385,36 @@ class Options:
         return Options(**fields_values)
 
 
+def _parse_int(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        return _parse_literal(value)
+
+
+_BOOL_VALUES = {'1': 1, '0': 0, 'true': True, 'false': False, 'True': True, 'False': False}
+
+
+def _parse_bool(value: str) -> Any:
+    if value in _BOOL_VALUES:
+        return _BOOL_VALUES[value]
+    return _parse_literal(value)
+
+
+def _parse_str(value: str) -> Any:
+    # Only quoted strings need decoding
+    if value.startswith(('"', "'")):
+        return _parse_literal(value)
+    return value
+
+
+# Parse each option according to its field type, only lists, dicts and unknown options need the literal parsers
+_TYPE_PARSERS: dict[Any, Callable[[str], Any]] = {int: _parse_int, bool: _parse_bool, str: _parse_str, IconStyle: str}
+# Fields configurable through tmux options, derived values are properties and _derived_cache is init=False
+_OPTION_FIELDS = tuple(f for f in dataclasses.fields(Options) if f.init)
+_OPTION_PARSERS = {f.name: _TYPE_PARSERS.get(f.type, _parse_literal) for f in _OPTION_FIELDS}
+
+
 def default_field_value(field_info):
     # field_info is a Field object from dataclasses
     if hasattr(field_info, 'default_factory') and field_info.default_factory is not dataclasses.MISSING:
@@ -263,85 +432,121 @@ def get_program_icon(program_name: str, options: Options) -> str:
     if ':' in base_name:
         base_name = base_name.split(':')[0]
 
+    if options.icon_map is None:
+        return _icon_for_base_name(base_name, options.custom_icons)
+    return options.icon_map.get(base_name, '')
+
+
+def build_icon_map(custom_icons: Any) -> Optional[dict[str, str]]:
+    """Merge custom_icons over the built-in icons, with the same precedence as `_icon_for_base_name`
+
+    Returns:
+        None when custom_icons isn't a dict of string icons, those are resolved per call instead
+    """
+    if not isinstance(custom_icons, dict) or not all(isinstance(icon, str) for icon in custom_icons.values() if icon):
+        return None
+
+    # Empty custom icons fall back to the built-in icon, or to no icon
+    icon_map = {**dict.fromkeys(custom_icons, ''), **DEFAULT_PROGRAM_ICONS}
+    icon_map.update((name, icon) for name, icon in custom_icons.items() if icon)
+    return {name: _decode_icon(icon) for name, icon in icon_map.items()}
+
+
+def _icon_for_base_name(base_name: str, custom_icons: dict[str, str]) -> str:
     # First check custom icons, then fall back to built-in icons
-    icon = options.custom_icons.get(base_name) or DEFAULT_PROGRAM_ICONS.get(base_name, '')
+    icon = custom_icons.get(base_name) or DEFAULT_PROGRAM_ICONS.get(base_name, '')
     # Always return "" for unknown programs (matches test expectation)
-    if base_name not in options.custom_icons and base_name not in DEFAULT_PROGRAM_ICONS:
+    if base_name not in custom_icons and base_name not in DEFAULT_PROGRAM_ICONS:
         return ''
 
+    icon = _decode_icon(icon)
+    logging.debug('Getting icon for program base_name=%s -> %r', base_name, icon)
+    return icon
+
+
+def _decode_icon(icon: str) -> str:
     # Decode Unicode escape sequences if present
     if icon.startswith('\\u'):
-        icon = icon.encode('utf-8').decode('unicode-escape')
-    logging.debug(f'Getting icon for program {program_name} (base_name: {base_name}) -> {icon!r}')
+        return icon.encode('utf-8').decode('unicode-escape')
     return icon
 
 
 def apply_icon_if_in_style(name: str, options: Options) -> str:
-    new_name = name
-    if options.icon_style in [IconStyle.ICON, IconStyle.NAME_AND_ICON]:
-        icon = get_program_icon(name, options)
-
-        if icon:
-            if options.icon_style == IconStyle.ICON:
-                new_name = f'{icon}'
-            elif options.icon_style == IconStyle.NAME_AND_ICON:
-                new_name = f'{icon} {name}'
-
-            logging.debug(f'Applied icon {icon} to name, {name}. New name: {new_name}')
+    icon_style = options.icon_style
+    if icon_style is IconStyle.NAME:
+        return name
+    if icon_style is not IconStyle.ICON and icon_style is not IconStyle.NAME_AND_ICON:
+        return name
+
+    icon = get_program_icon(name, options)
+    if not icon:
+        return name
+
+    new_name = icon if icon_style is IconStyle.ICON else f'{icon} {name}'
+    logging.debug('Applied icon %s to name, %s. New name: %s', icon, name, new_name)
     return new_name
 
 
 def parse_shell_command(shell_cmd: list[bytes]) -> Optional[str]:
     # Only shell
-    if len(shell_cmd) == 1:
-        return None
-
     if len(shell_cmd) < 2:
         return None
-    shell_cmd_str = [x.decode() for x in shell_cmd]
-    # Get base filename
-    shell_cmd_str[1] = Path(shell_cmd_str[1]).name
-    # Only return the program name, not arguments (matches test expectation)
-    return shell_cmd_str[1]
 
+    # Only return the base filename of the program, not arguments (matches test expectation)
+    return shell_cmd[1].rstrip(b'/').rpartition(b'/')[2].decode()
 
-def get_current_program(running_programs: list[bytes], pane: TmuxPane, options: Options) -> Optional[str]:
-    if pane.pane_pid is None:
-        msg = f'Pane id is none, pane: {pane}'
-        raise ValueError(msg)
 
-    logging.debug(f"searching for active pane's child with pane_pid={pane.pane_pid}")
+def build_programs_index(running_programs: list[bytes]) -> dict[bytes, list[list[bytes]]]:
+    """Group `ps -oppid,command` lines by their parent pid, kept as bytes so lookups need no int parsing.
 
+    Entries of this script are dropped here once instead of on every pane lookup.
+    """
+    programs_index: dict[bytes, list[list[bytes]]] = {}
     for program_line in running_programs:
         program_parts = program_line.split()
+        if len(program_parts) < 2:
+            continue
+        if len(program_parts) > 2 and _SCRIPT_MARKER in program_parts[2]:
+            logging.debug('skipping %r, its the script', program_parts[2])
+            continue
+        programs_index.setdefault(program_parts[0], []).append(program_parts[1:])
+    return programs_index
 
-        # if pid matches parse program
-        if int(program_parts[0]) == int(pane.pane_pid):
-            program_parts = program_parts[1:]
-            program_name = program_parts[0].decode()
-            # Do NOT remove leading dash for login shells when displaying, only for comparisons
-            program_name_stripped = re.sub(USR_BIN_REMOVER[0], USR_BIN_REMOVER[1], program_name)
-            program_key = program_name_stripped.lstrip('-')
-            logging.debug(
-                'program=%r program_name=%s program_name_stripped=%s program_key=%s',
-                program_parts,
-                program_name,
-                program_name_stripped,
-                program_key,
-            )
 
-            if len(program_parts) > 1 and 'scripts/rename_session_windows.py' in program_parts[1].decode():
-                logging.debug(f'skipping {program_parts[1]!r}, its the script')
-                continue
+def encode_skipped_programs(options: Options) -> frozenset[bytes]:
+    return frozenset(p.encode() for p in (*options.shells, *options.ignored_programs))
 
-            # Treat ignored programs and shells as "no program" so directory naming applies
-            if program_key in options.ignored_programs or program_key in options.shells:
-                return None
 
-            if not options.show_program_args:
-                return program_parts[0].decode()
+def get_current_program(
+    programs_index: dict[bytes, list[list[bytes]]],
+    pane: TmuxPane,
+    options: Options,
+    skipped_programs: Optional[frozenset[bytes]] = None,
+) -> Optional[str]:
+    if pane.pane_pid is None:
+        msg = f'Pane id is none, pane: {pane}'
+        raise ValueError(msg)
+
+    logging.debug("searching for active pane's child with pane_pid=%s", pane.pane_pid)
+
+    # Encoded shells and ignored programs, callers handling many panes pass it in to build it once
+    if skipped_programs is None:
+        skipped_programs = encode_skipped_programs(options)
 
-            return b' '.join(program_parts).decode()
+    for program_parts in programs_index.get(str(pane.pane_pid).encode(), []):
+        # Compare as bytes, only the returned name gets decoded
+        # Do NOT remove leading dash for login shells when displaying, only for comparisons
+        program_key = _USR_BIN_REMOVER_BYTES_RE.sub(_USR_BIN_REMOVER_BYTES_REPL, program_parts[0]).lstrip(b'-')
+        logging.debug('program=%r program_key=%r', program_parts, program_key)
+
+        # Treat ignored programs and shells as "no program" so directory naming applies
+        if program_key in skipped_programs:
+            return None
+
+        if not options.show_program_args:
+            return program_parts[0].decode()
+
+        return b' '.join(program_parts).decode()
 
     # If no matching PID, fall back to pane command if available
     fallback_cmd = pane.pane_current_command
@@ -350,7 +555,7 @@ def get_current_program(running_programs: list[bytes], pane: TmuxPane, options:
 
     fallback = cast('str', fallback_cmd)
     fallback_first = fallback.split()[0]
-    fallback_stripped = re.sub(USR_BIN_REMOVER[0], USR_BIN_REMOVER[1], fallback_first)
+    fallback_stripped = _USR_BIN_REMOVER_RE.sub(USR_BIN_REMOVER[1], fallback_first)
     fallback_key = fallback_stripped.lstrip('-')
     if fallback_key in options.shells or fallback_key in options.ignored_programs:
         return None
@@ -358,38 +563,69 @@ def get_current_program(running_programs: list[bytes], pane: TmuxPane, options:
     return fallback
 
 
-def get_program_if_dir(program_line: str, dir_programs: list[str]) -> Optional[str]:
+def get_program_if_dir(program_line: str, dir_programs: Collection[str]) -> Optional[str]:
     program = program_line.split()
     # Guard against empty input (matches test expectation)
-    if not program:
+    if not program or program[0] not in dir_programs:
         return None
 
-    for p in dir_programs:
-        if p == program[0]:
-            program[0] = p
-            return ' '.join(program)
-
-    return None
+    return ' '.join(program)
 
 
 def get_session_active_panes(session: Session) -> list[TmuxPane]:
-    # More efficient: iterate through session's windows directly
+    # One list-panes call for the whole session instead of listing every window's panes through libtmux
+    lines = session.server.cmd('list-panes', '-s', '-t', str(session.session_id), '-F', ACTIVE_PANES_FORMAT).stdout
     active_panes = []
-    for window in session.windows:
-        # Get the active pane for each window
-        for pane in window.panes:
-            if pane.pane_active == '1':
-                active_panes.append(pane)
-                break  # Only one active pane per window
+    for line in lines:
+        # Inactive panes are dropped before splitting, most panes of a session aren't active
+        if not line.startswith('1\t'):
+            continue
+        parts = line.split('\t', 5)
+        if len(parts) != 6:
+            continue
+        _, window_id, pane_id, pane_pid, pane_current_command, pane_current_path = parts
+        pane = SimpleNamespace(
+            pane_active='1',
+            window_id=window_id,
+            pane_id=pane_id,
+            pane_pid=pane_pid or None,
+            pane_current_command=pane_current_command or None,
+            pane_current_path=pane_current_path or None,
+        )
+        active_panes.append(cast('TmuxPane', pane))
     return active_panes
 
 
-def rename_window(server: Server, window_id: str, window_name: str, max_name_len: int, options: Options):
-    logging.debug(f'renaming window_id={window_id} to window_name={window_name}')
+def rename_window(
+    server: Server,
+    window_id: str,
+    window_name: str,
+    max_name_len: int,
+    options: Options,
+    commands: Optional[list[str]] = None,
+    settled_name: Optional[str] = None,
+):
+    """Rename a window, when `commands` is given the tmux commands are appended to it instead of being run
+
+    Nothing is appended when the window is already settled on the new name, see `WindowState.settled_name`
+    """
+    logging.debug('renaming window_id=%s to window_name=%s', window_id, window_name)
 
     window_name = apply_icon_if_in_style(window_name, options)
     window_name = window_name[:max_name_len]
-    logging.debug(f'shortened name window_name={window_name}')
+    logging.debug('shortened name window_name=%s', window_name)
+
+    if commands is not None:
+        if window_name == settled_name:
+            logging.debug('window_id=%s is already named %s', window_id, window_name)
+            return
+        quoted_name = quote_tmux_argument(window_name)
+        commands.append(f'rename-window -t {window_id} {quoted_name}')
+        # Setting format so automatic-rename uses same name
+        commands.append(f'set-option -wq -t {window_id} automatic-rename-format {quoted_name}')
+        # Turn on automatic-rename to make resurrect remember the option
+        commands.append(f'set-option -wq -t {window_id} automatic-rename on')
+        return
 
     # Find the window object and use its rename_window method
     window_found = False
@@ -415,17 +651,100 @@ def rename_window(server: Server, window_id: str, window_name: str, max_name_len
     )  # Turn on automatic-rename to make resurrect remember the option
 
 
+def quote_tmux_argument(value: str) -> str:
+    """Quote a value to be used as a single argument in a tmux configuration file"""
+    # Nothing is expanded inside single quotes, a single quote itself is closed, escaped and reopened
+    return "'" + value.replace("'", "'\\''") + "'"
+
+
+def source_tmux_commands(server: Server, commands: list[str]):
+    """Run tmux commands with a single `source-file` instead of a tmux call per command"""
+    if not commands:
+        return
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', prefix='tmux-window-name-', delete=False) as f:
+        f.write('\n'.join(commands) + '\n')
+
+    try:
+        server.cmd('source-file', f.name)
+    finally:
+        Path(f.name).unlink()
+
+
+def read_proc_children(ppids: list[int]) -> Optional[list[bytes]]:
+    """Build `ps -oppid,command` like lines for the children of ppids from /proc.
+
+    Returns None when there is no /proc, so the caller can fall back to ps.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    self_pid = os.getpid()
+    if (PROC_DIR / str(self_pid) / 'task' / str(self_pid) / 'children').exists():
+        children_by_ppid = {ppid: _read_task_children(ppid) for ppid in ppids}
+    elif (PROC_DIR / str(self_pid) / 'stat').exists():
+        # Kernels without CONFIG_PROC_CHILDREN, one pass over /proc is still cheaper than running ps
+        children_by_ppid = _scan_proc_children(set(ppids))
+    else:
+        return None
+
+    running_programs = []
+    for ppid in ppids:
+        for child in children_by_ppid.get(ppid, []):
+            try:
+                cmdline = (PROC_DIR / str(child) / 'cmdline').read_bytes()
+                args = [arg for arg in cmdline.split(b'\0') if arg]
+                if not args:
+                    # Kernel threads and zombies have no cmdline, ps shows their name in brackets
+                    args = [b'[' + (PROC_DIR / str(child) / 'comm').read_bytes().strip() + b']']
+            except OSError:
+                # The child exited while we were reading it
+                continue
+            running_programs.append(b' '.join([str(ppid).encode(), *args]))
+    return running_programs
+
+
+def _read_task_children(ppid: int) -> list[int]:
+    children: set[int] = set()
+    for children_file in (PROC_DIR / str(ppid) / 'task').glob('*/children'):
+        try:
+            children.update(int(pid) for pid in children_file.read_text().split())
+        except OSError:
+            continue
+    return sorted(children)
+
+
+def _scan_proc_children(ppids: set[int]) -> dict[int, list[int]]:
+    children: dict[int, list[int]] = {}
+    with os.scandir(PROC_DIR) as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                stat = (PROC_DIR / entry.name / 'stat').read_bytes()
+            except OSError:
+                continue
+            # The comm field may hold spaces and parentheses, the state and ppid fields follow its last ')'
+            ppid = int(stat[stat.rindex(b')') + 1 :].split(maxsplit=2)[1])
+            if ppid in ppids:
+                children.setdefault(ppid, []).append(int(entry.name))
+    return {ppid: sorted(pids) for ppid, pids in children.items()}
+
+
 def get_panes_programs(session: Session, options: Options) -> list[Pane]:
     session_active_panes = get_session_active_panes(session)
-    try:
-        running_programs = subprocess.check_output(['ps', '-a', '-oppid,command']).splitlines()[1:]
-        logging.debug(f'running_programs={running_programs}')
-    # can occur if ps has empty output
-    except subprocess.CalledProcessError:
-        logging.warning('nothing returned from `ps -a -oppid,command`')
-        running_programs = []
+    running_programs = read_proc_children([int(p.pane_pid) for p in session_active_panes if p.pane_pid is not None])
+    if running_programs is None:
+        try:
+            running_programs = subprocess.check_output(['ps', '-a', '-oppid,command']).splitlines()[1:]
+        # can occur if ps has empty output
+        except subprocess.CalledProcessError:
+            logging.warning('nothing returned from `ps -a -oppid,command`')
+            running_programs = []
+    logging.debug('running_programs=%s', running_programs)
 
-    return [Pane(p, get_current_program(running_programs, p, options)) for p in session_active_panes]
+    programs_index = build_programs_index(running_programs)
+    skipped_programs = encode_skipped_programs(options)
+    return [Pane(p, get_current_program(programs_index, p, options, skipped_programs)) for p in session_active_panes]
 
 
 def rename_windows(server: Server, options: Options):
@@ -434,51 +753,71 @@ def rename_windows(server: Server, options: Options):
             return
 
         current_session = get_current_session(server)
+        windows_state = _load_windows_state(server)
+        commands: list[str] = []
+
+        # Single pass: rename program panes right away, collect the ones named after their directory
+        panes_with_dir: list[Pane] = []
+        for pane in get_panes_programs(current_session, options):
+            pane = fix_pane_path(pane, options)
+            if pane.program is None:
+                panes_with_dir.append(pane)
+                continue
 
-        panes_programs = get_panes_programs(current_session, options)
-        panes_programs = [fix_pane_path(p, options) for p in panes_programs]
-        panes_with_programs = [p for p in panes_programs if p.program is not None]
-        panes_with_dir = [p for p in panes_programs if p.program is None]
-
-        logging.debug(f'panes_with_programs={panes_with_programs}')
-        logging.debug(f'panes_with_dir={panes_with_dir}')
-
-        for pane in panes_with_programs:
-            enabled_in_window = get_window_option(server, pane.info.window_id, 'enabled', 1)
-            if not enabled_in_window:
-                logging.debug(f'tmux window isnt enabled in {pane.info.window_id}')
+            window_state = windows_state.get(str(pane.info.window_id), _DEFAULT_WINDOW_STATE)
+            if window_state.enabled == '0':
+                logging.debug('tmux window isnt enabled in %s', pane.info.window_id)
                 continue
 
-            program_name = get_program_if_dir(str(pane.program), options.dir_programs)
+            program_name = get_program_if_dir(str(pane.program), options.dir_programs_set)
             if program_name is not None:
-                logging.debug(f'program is a dir program, program:{str(pane.program)}')
+                logging.debug('program is a dir program, program:%s', pane.program)
                 pane.program = program_name
                 panes_with_dir.append(pane)
                 continue
 
-            logging.debug(f'processing program without dir: {str(pane.program)}')
-            pane.program = substitute_name(str(pane.program), options.substitute_sets)
-            rename_window(server, str(pane.info.window_id), pane.program, options.max_name_len, options)
+            logging.debug('processing program without dir: %s', pane.program)
+            pane.program = substitute_name(str(pane.program), options.compiled_substitute_sets)
+            rename_window(
+                server,
+                str(pane.info.window_id),
+                pane.program,
+                options.max_name_len,
+                options,
+                commands,
+                window_state.settled_name,
+            )
 
         exclusive_paths = get_exclusive_paths(panes_with_dir)
         logging.debug(
-            f'get_exclusive_paths result, input: panes_with_dir={panes_with_dir}, '
-            f'output: exclusive_paths={exclusive_paths}'
+            'get_exclusive_paths result, input: panes_with_dir=%s, output: exclusive_paths=%s',
+            panes_with_dir,
+            exclusive_paths,
         )
 
         for p, display_path in exclusive_paths:
-            enabled_in_window = get_window_option(server, p.info.window_id, 'enabled', 1)
-            if not enabled_in_window:
-                logging.debug(f'tmux window isnt enabled in {p.info.window_id}')
+            window_state = windows_state.get(str(p.info.window_id), _DEFAULT_WINDOW_STATE)
+            if window_state.enabled == '0':
+                logging.debug('tmux window isnt enabled in %s', p.info.window_id)
                 continue
 
-            logging.debug(f'processing exclusive_path: display_path={display_path} p.program={p.program}')
-            display_value = substitute_name(str(display_path), options.dir_substitute_sets)
+            logging.debug('processing exclusive_path: display_path=%s p.program=%s', display_path, p.program)
+            display_value = substitute_name(str(display_path), options.compiled_dir_substitute_sets)
             if p.program is not None:
-                p.program = substitute_name(p.program, options.substitute_sets)
+                p.program = substitute_name(p.program, options.compiled_substitute_sets)
                 display_value = f'{p.program}:{display_value}'
 
-            rename_window(server, str(p.info.window_id), display_value, options.max_name_len, options)
+            rename_window(
+                server,
+                str(p.info.window_id),
+                display_value,
+                options.max_name_len,
+                options,
+                commands,
+                window_state.settled_name,
+            )
+
+        source_tmux_commands(server, commands)
 
 
 # Fix pane path according to the options
@@ -490,31 +829,112 @@ def fix_pane_path(pane: Pane, options: Options) -> Pane:
     path_str = str(path)
 
     if options.use_tilde:
-        if path_str == HOME_DIR:
-            path_str = '~'
-        elif path_str.startswith(f'{HOME_DIR}/'):
-            path_str = path_str.replace(HOME_DIR, '~', 1)
-        logging.debug(f'replaced tilde with HOME_DIR={HOME_DIR}: path={path_str}')
+        if path_str == HOME_DIR or path_str.startswith(_HOME_PREFIX):
+            path_str = '~' + path_str[len(HOME_DIR) :]
+        logging.debug('replaced tilde with HOME_DIR=%s: path=%s', HOME_DIR, path_str)
 
     pane.info.pane_current_path = path_str
     return pane
 
 
 def get_current_session(server: Server) -> Session:
+    # The session doesn't change during a run, only ask tmux once per server
+    cached_session = vars(server).get(_SESSION_CACHE_ATTR)
+    if cached_session is not None:
+        return cast('Session', cached_session)
+
     # Get the attached session(s) - there should be at least one
     attached_sessions = server.attached_sessions
     if attached_sessions:
-        return attached_sessions[0]
-    # Fallback to the old method if no attached sessions
-    session_id = server.cmd('display-message', '-p', '#{session_id}').stdout[0]
-    return Session(server, session_id=session_id)
+        session = attached_sessions[0]
+    else:
+        # Fallback to the old method if no attached sessions
+        out = server.cmd('display-message', '-p', '#{session_id}').stdout
+        if not out:
+            msg = 'Could not find the current tmux session'
+            raise ValueError(msg)
+        session = Session(server, session_id=out[0])
+
+    setattr(server, _SESSION_CACHE_ATTR, session)
+    return session
+
+
+def compile_substitute_sets(substitute_sets: list[tuple[str, str]]) -> list[CompiledSubstitution]:
+    compiled = []
+    for substitution in substitute_sets:
+        # A broken user rule is skipped, it must not stop Options from being built for every other action
+        try:
+            pattern, replacement = substitution
+            compiled.append(CompiledSubstitution(re.compile(pattern), replacement, required_literal(pattern)))
+        except (re.error, TypeError, ValueError, IndexError) as error:
+            logging.warning('skipping invalid substitution %r: %s', substitution, error)
+    return compiled
+
+
+def required_literal(pattern: str) -> str:
+    """Longest plain text every match of pattern must contain, empty when it can't tell"""
+    # Alternations, escapes and inline flags/lookarounds can make any literal optional, don't guess
+    if '|' in pattern or '\\' in pattern or '(?' in pattern:
+        return ''
+
+    # Best literal of each open group, the last entry is the top level
+    best = ['']
+    run = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char in '?*{':
+            # The previous character (or group) may not be there at all
+            run = run[:-1]
+            best[-1] = max(best[-1], run, key=len)
+            run = ''
+            if char == '{':
+                end = pattern.find('}', i)
+                if end == -1:
+                    return ''
+                i = end
+        elif char in '.^$+)([':
+            best[-1] = max(best[-1], run, key=len)
+            run = ''
+            if char == '(':
+                best.append('')
+            elif char == ')':
+                if len(best) < 2:
+                    return ''
+                group_best = best.pop()
+                # An optional group contributes nothing
+                if i + 1 >= len(pattern) or pattern[i + 1] not in '?*{':
+                    best[-1] = max(best[-1], group_best, key=len)
+            elif char == '[':
+                # A leading ^ or ] is part of the set, not its end
+                start = i + 2 if pattern[i + 1 : i + 2] == '^' else i + 1
+                end = pattern.find(']', start + 1)
+                if end == -1:
+                    return ''
+                i = end
+        else:
+            run += char
+        i += 1
+
+    if len(best) != 1:
+        return ''
+    return max(best[0], run, key=len)
 
 
-def substitute_name(name: str, substitute_sets: list[tuple[str, str]]) -> str:
-    logging.debug(f'substituting {name}')
-    for pattern, replacement in substitute_sets:
-        name = re.sub(pattern, replacement, name)
-        logging.debug(f'after pattern={pattern} replacement={replacement}: {name}')
+def substitute_name(name: str, substitute_sets: Sequence[Union[tuple[str, str], CompiledSubstitution]]) -> str:
+    logging.debug('substituting %s', name)
+    if not substitute_sets:
+        return name
+
+    for substitution in substitute_sets:
+        if isinstance(substitution, CompiledSubstitution):
+            if substitution.required not in name:
+                continue
+            name = substitution.pattern.sub(substitution.replacement, name)
+        else:
+            pattern, replacement = substitution
+            name = re.sub(pattern, replacement, name)
+        logging.debug('after substitution=%s: %s', substitution, name)
 
     return name
 
@@ -526,7 +946,7 @@ def print_programs(server: Server, options: Options):
 
     for pane in panes_programs:
         if pane.program:
-            program_name = substitute_name(pane.program, options.substitute_sets)
+            program_name = substitute_name(pane.program, options.compiled_substitute_sets)
             program_name = apply_icon_if_in_style(program_name, options)
             print(f'{pane.program} -> {program_name}')
 
@@ -545,25 +965,23 @@ def main():
     )
 
     args = parser.parse_args()
-    options = Options.from_options(server)
 
-    # Clear loggers from other modules
-    logging.config.dictConfig(
-        {
-            'version': 1,
-            'disable_existing_loggers': True,
-        }
-    )
+    # Clear loggers from other modules, what dictConfig's disable_existing_loggers does without logging.config
+    for logger in logging.root.manager.loggerDict.values():
+        if isinstance(logger, logging.Logger):
+            logger.disabled = True
 
-    log_level = logging._nameToLevel.get(options.log_level, logging.WARNING)
+    # Log to the file before reading the options so warnings about them are kept, the configured level applies after
     log_file = Path(tempfile.gettempdir()) / 'tmux-window-name.log'
     logging.basicConfig(
-        level=log_level,
+        level=logging.WARNING,
         filename=str(log_file),
         format='%(levelname)s - %(filename)s:%(lineno)d %(funcName)s() %(message)s',
     )
-    logging.debug(f'Args: {args}')
-    logging.debug(f'Options: {options}')
+    options = Options.from_options(server)
+    logging.root.setLevel(logging._nameToLevel.get(options.log_level, logging.WARNING))
+    logging.debug('Args: %s', args)
+    logging.debug('Options: %s', options)
 
     try:
         if args.print_programs:
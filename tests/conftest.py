@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 
 import contextlib
+import tempfile
 import uuid
 from pathlib import Path
 
 import pytest
 from libtmux import exc
 
+from scripts.rename_session_windows import Options
+
+from .test_utils import TEST_DIR_PREFIX, fast_tmp_dir, remove_directory_tree
+
 
 @pytest.fixture(scope='session', autouse=True)
 def set_tmux_tmpdir():
@@ -23,6 +28,22 @@ def set_tmux_tmpdir():
         mp.undo()
 
 
+@pytest.fixture(scope='session')
+def default_options():
+    """Shared default Options for tests that only read them, tests that mutate options build their own."""
+    return Options()
+
+
+@pytest.fixture(scope='session')
+def test_dirs_root():
+    """Single temporary root for the test directory helpers, removed once when the session ends."""
+    root = Path(tempfile.mkdtemp(prefix=TEST_DIR_PREFIX, dir=fast_tmp_dir()))
+    try:
+        yield root
+    finally:
+        remove_directory_tree(root)
+
+
 @pytest.fixture
 def tmux_session(server):
     """Provide a temporary tmux session or skip if tmux cannot start."""
@@ -43,3 +64,10 @@ def pytest_configure(config: pytest.Config) -> None:
     pluginmanager = config.pluginmanager
     if not (pluginmanager.has_plugin('libtmux') or pluginmanager.has_plugin('libtmux.pytest_plugin')):
         pluginmanager.import_plugin('libtmux.pytest_plugin')
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    # Keep serial tests on one worker under `pytest -n auto --dist loadgroup`
+    for item in items:
+        if item.get_closest_marker('serial') is not None:
+            item.add_marker(pytest.mark.xdist_group('serial'))
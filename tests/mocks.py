@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
+from types import SimpleNamespace
 from unittest.mock import Mock
 
 
@@ -76,11 +79,12 @@ class Session:
     1:1 mock of libtmux.Session
     """
 
-    def __init__(self, session_id='$1', session_name='test_session', index=0):
+    def __init__(self, session_id='$1', session_name='test_session', index=0, server=None):
         self.session_id = session_id
         self.name = session_name
         self.windows = []
         self.index = index
+        self.server = server if server is not None else SessionServer(self)
 
     def __getitem__(self, key):
         if key == 'session_id':
@@ -104,6 +108,59 @@ class Session:
         return f'<Session id={self.session_id} name={self.name}>'
 
 
+class SessionServer:
+    """
+    Minimal libtmux.Server mock answering `list-panes` from a mock Session's windows
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.cmd = Mock(side_effect=self._cmd)
+
+    def _cmd(self, *args):
+        result = Mock()
+        result.stdout = []
+        if args and args[0] == 'list-panes':
+            result.stdout = [
+                '\t'.join(
+                    '' if value is None else str(value)
+                    for value in (
+                        pane.pane_active,
+                        window.window_id,
+                        pane.pane_id,
+                        pane.pane_pid,
+                        pane.pane_current_command,
+                        pane.pane_current_path,
+                    )
+                )
+                for window in self.session.windows
+                for pane in window.panes
+            ]
+        return result
+
+
+class FakeServer:
+    """
+    Plain libtmux.Server stand-in answering `cmd` from a table of canned outputs, for tests that don't assert calls
+    """
+
+    def __init__(self, stdout=None):
+        self.sessions = []
+        self.windows = []
+        # Output of commands without a registered response
+        self.default_stdout = stdout if stdout is not None else []
+        self.responses = {}
+
+    def respond(self, args, stdout):
+        self.responses[tuple(args)] = stdout
+
+    def cmd(self, *args):
+        return SimpleNamespace(stdout=self.responses.get(args, self.default_stdout))
+
+    def __repr__(self):
+        return '<FakeServer>'
+
+
 class Server:
     """
     1:1 mock of libtmux.Server
@@ -132,9 +189,6 @@ class Server:
     def socket_name(self):
         # Mimic libtmux.Server attribute for compatibility in tests
         # Use tempfile.mkstemp to avoid Ruff S306 warning
-        import os
-        import tempfile
-
         fd, path = tempfile.mkstemp(prefix='tmux-mock-socket-')
         os.close(fd)
         return path
@@ -1,147 +1,120 @@
 #!/usr/bin/env python3
 
-import os
+import logging
 import sys
-from unittest.mock import patch
+from unittest.mock import MagicMock
 
 import pytest
 
 from scripts import rename_session_windows
 
-pytestmark = pytest.mark.usefixtures('_reset_sys_argv')
-
-
-@pytest.fixture
-def _reset_sys_argv():
-    orig_argv = sys.argv[:]
-    yield
-    sys.argv = orig_argv
-
-
-def test_main_default_behavior():
-    """Test main script with no arguments (default behavior)."""
-    sys.argv = ['rename_session_windows.py']
-    # Patch Server and rename_windows to avoid real tmux calls
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.rename_windows') as mock_rename_windows,
-    ):
-        mock_rename_windows.return_value = None
-        result = rename_session_windows.main()
-        assert result == 0
-        mock_rename_windows.assert_called_once()
-
-
-def test_main_print_programs(capsys):
-    """Test main script with --print_programs argument."""
-    sys.argv = ['rename_session_windows.py', '--print_programs']
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.print_programs') as mock_print_programs,
-    ):
-        mock_print_programs.return_value = None
-        result = rename_session_windows.main()
-        assert result == 0
-        mock_print_programs.assert_called_once()
-
-
-def test_main_enable_rename_hook():
-    """Test main script with --enable_rename_hook argument."""
-    sys.argv = ['rename_session_windows.py', '--enable_rename_hook']
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.enable_user_rename_hook') as mock_enable_hook,
-    ):
-        mock_enable_hook.return_value = None
-        result = rename_session_windows.main()
-        assert result == 0
-        mock_enable_hook.assert_called_once()
-
-
-def test_main_disable_rename_hook():
-    """Test main script with --disable_rename_hook argument."""
-    sys.argv = ['rename_session_windows.py', '--disable_rename_hook']
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.disable_user_rename_hook') as mock_disable_hook,
-    ):
-        mock_disable_hook.return_value = None
-        result = rename_session_windows.main()
-        assert result == 0
-        mock_disable_hook.assert_called_once()
-
-
-def test_main_post_restore():
-    """Test main script with --post_restore argument."""
-    sys.argv = ['rename_session_windows.py', '--post_restore']
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.post_restore') as mock_post_restore,
-    ):
-        mock_post_restore.return_value = None
-        result = rename_session_windows.main()
-        assert result == 0
-        mock_post_restore.assert_called_once()
-
-
-def test_main_invalid_argument():
+ACTIONS = ['rename_windows', 'print_programs', 'enable_user_rename_hook', 'disable_user_rename_hook', 'post_restore']
+
+
+@pytest.fixture(autouse=True)
+def mocks(monkeypatch):
+    """Replace Server and every action with mocks to avoid real tmux calls, tests configure them as needed."""
+    installed = {name: MagicMock() for name in ['Server', *ACTIONS]}
+    for name, mock in installed.items():
+        monkeypatch.setattr(rename_session_windows, name, mock)
+    return installed
+
+
+@pytest.mark.parametrize(
+    ('argv', 'target', 'env'),
+    [
+        pytest.param([], 'rename_windows', {}, id='default'),
+        pytest.param(['--print_programs'], 'print_programs', {}, id='print_programs'),
+        pytest.param(['--enable_rename_hook'], 'enable_user_rename_hook', {}, id='enable_rename_hook'),
+        pytest.param(['--disable_rename_hook'], 'disable_user_rename_hook', {}, id='disable_rename_hook'),
+        pytest.param(['--post_restore'], 'post_restore', {}, id='post_restore'),
+        pytest.param([], 'rename_windows', {'TMUX_PANE': '%1'}, id='tmux_pane_env'),
+    ],
+)
+def test_main_dispatch(monkeypatch, mocks, argv, target, env):
+    """Test main script runs the action matching its arguments and only that one."""
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', *argv])
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    result = rename_session_windows.main()
+    assert result == 0
+    mocks[target].assert_called_once()
+    for action in ACTIONS:
+        if action != target:
+            mocks[action].assert_not_called()
+
+
+def test_main_invalid_argument(monkeypatch):
     """Test main script with invalid argument."""
-    sys.argv = ['rename_session_windows.py', '--invalid_arg']
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', '--invalid_arg'])
     # Patch argparse to raise SystemExit for invalid argument
     with pytest.raises(SystemExit):
         rename_session_windows.main()
 
 
-def test_main_server_exception():
+def test_main_server_exception(monkeypatch, mocks):
     """Test main script raises exception if Server init fails."""
-    sys.argv = ['rename_session_windows.py']
-    msg = 'Server error'
-    with (
-        patch('scripts.rename_session_windows.Server', side_effect=Exception(msg)),
-        pytest.raises(Exception, match=msg),
-    ):
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py'])
+    mocks['Server'].side_effect = RuntimeError('Server error')
+    with pytest.raises(RuntimeError):
         rename_session_windows.main()
 
 
-def test_main_hook_exception():
+def test_main_hook_exception(monkeypatch, mocks):
     """Test main script returns error code if hook fails."""
-    sys.argv = ['rename_session_windows.py', '--enable_rename_hook']
-    msg = 'Hook error'
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.enable_user_rename_hook', side_effect=Exception(msg)),
-    ):
-        result = rename_session_windows.main()
-        assert result == 1
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', '--enable_rename_hook'])
+    mocks['enable_user_rename_hook'].side_effect = RuntimeError('Hook error')
+    result = rename_session_windows.main()
+    assert result == 1
 
 
-def test_main_print_programs_output(capsys):
+def test_main_print_programs_output(monkeypatch, mocks, capsys):
     """Test main script prints output for --print_programs."""
-    sys.argv = ['rename_session_windows.py', '--print_programs']
-    with (
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.print_programs') as mock_print_programs,
-    ):
-
-        def fake_print_programs(server, options):
-            print('Program: python')
-
-        mock_print_programs.side_effect = fake_print_programs
-        result = rename_session_windows.main()
-        assert result == 0
-        captured = capsys.readouterr()
-        assert 'Program: python' in captured.out
-
-
-def test_main_with_env_var():
-    """Test main script with TMUX_PANE environment variable set."""
-    sys.argv = ['rename_session_windows.py']
-    with (
-        patch.dict(os.environ, {'TMUX_PANE': '%1'}),
-        patch('scripts.rename_session_windows.Server'),
-        patch('scripts.rename_session_windows.rename_windows') as mock_rename_windows,
-    ):
-        mock_rename_windows.return_value = None
-        result = rename_session_windows.main()
-        assert result == 0
-        mock_rename_windows.assert_called_once()
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', '--print_programs'])
+
+    def fake_print_programs(server, options):
+        print('Program: python')
+
+    mocks['print_programs'].side_effect = fake_print_programs
+    result = rename_session_windows.main()
+    assert result == 0
+    captured = capsys.readouterr()
+    assert 'Program: python' in captured.out
+
+
+def test_main_disables_other_loggers(monkeypatch, mocks):
+    """Test main() silences loggers created by other modules."""
+    other_logger = logging.getLogger('tmux_window_name_test_other')
+    monkeypatch.setattr(other_logger, 'disabled', False)
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py'])
+    assert rename_session_windows.main() == 0
+    assert other_logger.disabled is True
+
+
+@pytest.mark.parametrize(
+    ('argv', 'target'),
+    [
+        pytest.param(['--enable_rename_hook'], 'enable_user_rename_hook', id='enable_rename_hook'),
+        pytest.param(['--post_restore'], 'post_restore', id='post_restore'),
+        pytest.param([], 'rename_windows', id='default'),
+    ],
+)
+def test_main_skips_invalid_substitution(monkeypatch, mocks, caplog, argv, target):
+    """Test a malformed substitution regex is logged and skipped instead of failing every action."""
+    monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', *argv])
+    monkeypatch.setattr(
+        rename_session_windows,
+        '_load_all_options',
+        lambda _server: {'substitute_sets': "[('(', 'x'), ('vim', 'editor')]"},
+    )
+    monkeypatch.setattr(logging.root, 'level', logging.root.level)
+
+    with caplog.at_level(logging.WARNING):
+        assert rename_session_windows.main() == 0
+
+    mocks[target].assert_called_once()
+    # The rules are only compiled once substitutions are used, the bad one is logged and skipped then
+    if target == 'rename_windows':
+        options = mocks[target].call_args.args[1]
+        assert [s.pattern.pattern for s in options.compiled_substitute_sets] == ['vim']
+        assert 'skipping invalid substitution' in caplog.text
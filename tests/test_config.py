@@ -1,28 +1,14 @@
 #!/usr/bin/env python3
 
-from unittest.mock import Mock
-
 import pytest
 
 from scripts.rename_session_windows import (
     IconStyle,
     Options,
     get_option,
+    substitute_name,
 )
-
-
-class FakeServer:
-    def __init__(self):
-        self.cmd = Mock()
-        self.cmd.return_value = self
-        self.sessions = []
-        self.windows = []
-        self._options = {}
-
-
-@pytest.fixture
-def fake_server():
-    return FakeServer()
+from tests.mocks import FakeServer
 
 
 def test_valid_icon_style_options():
@@ -59,6 +45,16 @@ def test_shells_and_dir_programs():
     options = Options(shells=shells, dir_programs=dir_programs)
     assert options.shells == shells
     assert options.dir_programs == dir_programs
+    assert options.dir_programs_set == frozenset(dir_programs)
+
+
+def test_dir_programs_set_follows_dir_programs():
+    """Test dir_programs_set reflects dir_programs changed after construction."""
+    options = Options()
+    options.dir_programs = ['foo']
+    assert options.dir_programs_set == frozenset({'foo'})
+    options.dir_programs.append('bar')
+    assert options.dir_programs_set == frozenset({'foo', 'bar'})
 
 
 def test_custom_icons_valid():
@@ -83,9 +79,28 @@ def test_substitute_sets_and_dir_substitute_sets():
     assert options.dir_substitute_sets == dir_subs
 
 
-def test_missing_options_use_defaults():
-    """Test missing options use defaults."""
+def test_substitute_sets_are_precompiled():
+    """Test substitute_sets are compiled once when Options is created."""
+    options = Options(substitute_sets=[('_', '-')], dir_substitute_sets=[('src', 'source')])
+    assert [(s.pattern.pattern, s.replacement) for s in options.compiled_substitute_sets] == [('_', '-')]
+    assert [(s.pattern.pattern, s.replacement) for s in options.compiled_dir_substitute_sets] == [('src', 'source')]
+    assert substitute_name('a_b', options.compiled_substitute_sets) == 'a-b'
+
+
+def test_compiled_substitute_sets_follow_rules():
+    """Test the compiled substitutions reflect rules changed after construction."""
     options = Options()
+    options.substitute_sets = [('_', '-')]
+    options.dir_substitute_sets = [('src', 'source')]
+    assert substitute_name('a_b', options.compiled_substitute_sets) == 'a-b'
+    assert substitute_name('src/x', options.compiled_dir_substitute_sets) == 'source/x'
+    options.substitute_sets.append(('a', 'A'))
+    assert substitute_name('a_b', options.compiled_substitute_sets) == 'A-b'
+
+
+def test_missing_options_use_defaults(default_options):
+    """Test missing options use defaults."""
+    options = default_options
     assert isinstance(options.shells, list)
     assert isinstance(options.dir_programs, list)
     assert options.icon_style == IconStyle.NAME
@@ -115,39 +130,35 @@ def test_type_handling_for_options():
     assert options.custom_icons == [('python', '🐍')]
 
 
-def test_server_option_parsing_valid(fake_server):
-    """Test get_option parses valid server option values."""
-    fake_server.cmd.return_value.stdout = ['"icon"']
-    value = get_option(fake_server, 'icon_style', IconStyle.NAME)
-    assert value == '"icon"' or value == 'icon' or value == IconStyle.ICON
-
-
-def test_server_option_parsing_invalid(fake_server):
-    """Test get_option returns default for missing server option."""
-    fake_server.cmd.return_value.stdout = []
-    value = get_option(fake_server, 'max_name_len', 20)
-    assert value == 20
-
-
-def test_server_option_parsing_json(fake_server):
-    """Test get_option parses JSON values."""
-    fake_server.cmd.return_value.stdout = ['["bash", "zsh"]']
-    value = get_option(fake_server, 'shells', ['bash'])
-    assert isinstance(value, list)
-    assert 'bash' in value
-    assert 'zsh' in value
-
-
-def test_server_option_parsing_literal_eval(fake_server):
-    """Test get_option parses Python literal values."""
-    fake_server.cmd.return_value.stdout = ["{'python': '🐍'}"]
-    value = get_option(fake_server, 'custom_icons', {})
-    assert isinstance(value, dict)
-    assert value.get('python') == '🐍'
-
-
-def test_server_option_parsing_string_fallback(fake_server):
-    """Test get_option returns string if all parsing fails."""
-    fake_server.cmd.return_value.stdout = ['not_json']
-    value = get_option(fake_server, 'max_name_len', 20)
-    assert value == 'not_json'
+@pytest.mark.parametrize(
+    ('stdout', 'option', 'default', 'expected'),
+    [
+        pytest.param(['"icon"'], 'icon_style', IconStyle.NAME, '"icon"', id='valid'),
+        pytest.param([], 'max_name_len', 20, 20, id='missing'),
+        pytest.param(['["bash", "zsh"]'], 'shells', ['bash'], ['bash', 'zsh'], id='json'),
+        pytest.param(["{'python': '🐍'}"], 'custom_icons', {}, {'python': '🐍'}, id='literal_eval'),
+        pytest.param(['not_json'], 'max_name_len', 20, 'not_json', id='string_fallback'),
+        pytest.param(['null'], 'unknown_option', None, None, id='json_keyword'),
+        pytest.param(['None'], 'unknown_option', None, None, id='literal_keyword'),
+    ],
+)
+def test_server_option_parsing(stdout, option, default, expected):
+    """Test get_option parses server option values, falling back to the default or the raw string."""
+    assert get_option(FakeServer(stdout), option, default) == expected
+
+
+@pytest.mark.parametrize(
+    ('option', 'raw', 'expected'),
+    [
+        ('max_name_len', '30', 30),
+        ('use_tilde', '1', 1),
+        ('show_program_args', 'False', False),
+        ('log_level', 'DEBUG', 'DEBUG'),
+        ('log_level', '"INFO"', 'INFO'),
+        ('icon_style', 'icon', 'icon'),
+        ('shells', "['bash', 'zsh']", ['bash', 'zsh']),
+    ],
+)
+def test_server_option_parsing_by_field_type(option, raw, expected):
+    """Test get_option parses each option according to its field type."""
+    assert get_option(FakeServer([raw]), option, None) == expected
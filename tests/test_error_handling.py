@@ -16,24 +16,30 @@ from tests.mocks import Server
 # Mocks are now imported from tests/mocks.py
 
 
-@pytest.fixture
-def fake_server():
+@pytest.fixture(scope='session')
+def shared_fake_server():
     return Server()
 
 
+@pytest.fixture
+def fake_server(shared_fake_server):
+    # Reuse one server, only its recorded calls, outputs and side effects are reset per test
+    shared_fake_server.cmd.reset_mock(return_value=True, side_effect=True)
+    return shared_fake_server
+
+
 def test_tmux_command_failure(fake_server):
     """Simulate tmux command raising an exception."""
-    fake_server.cmd.side_effect = Exception('tmux failure')
-    with pytest.raises(Exception, match='tmux failure'):
+    fake_server.cmd.side_effect = RuntimeError('tmux failure')
+    with pytest.raises(RuntimeError):
         fake_server.cmd('show-option')
 
 
-def test_rename_window_tmux_failure(fake_server):
+def test_rename_window_tmux_failure(fake_server, default_options):
     """Test rename_window handles tmux command failure gracefully."""
-    fake_server.cmd.side_effect = Exception('rename-window failed')
-    options = Options()
-    with pytest.raises(Exception, match='rename-window failed'):
-        rename_window(fake_server, '1', 'test', 20, options)
+    fake_server.cmd.side_effect = RuntimeError('rename-window failed')
+    with pytest.raises(RuntimeError):
+        rename_window(fake_server, '1', 'test', 20, default_options)
 
 
 def test_invalid_icon_style_fallback():
@@ -53,7 +59,7 @@ def test_negative_max_name_len():
 def test_malformed_custom_icons():
     """Test malformed custom_icons raises error as implementation expects string."""
     options = Options(custom_icons={'python': None, 'docker': 123})  # type: ignore
-    with pytest.raises(Exception, match='startswith'):
+    with pytest.raises(AttributeError, match='startswith'):
         get_program_icon('docker', options)
 
 
@@ -63,17 +69,17 @@ def test_main_exception_handling(monkeypatch):
     class BrokenServer:
         def __init__(self):
             msg = 'Server init failed'
-            raise Exception(msg)
+            raise RuntimeError(msg)
 
     monkeypatch.setattr('scripts.rename_session_windows.Server', BrokenServer)
     monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py'])
-    with pytest.raises(Exception, match='Server init failed'):
+    with pytest.raises(RuntimeError):
         main()
 
 
-def test_missing_pane_attributes():
+def test_missing_pane_attributes(default_options):
     """Test handling of missing pane attributes."""
-    options = Options()
+    options = default_options
     # get_program_icon should not crash if passed a broken pane
     try:
         get_program_icon(getattr(object(), 'pane_current_command', 'unknown'), options)
@@ -88,9 +94,9 @@ def test_invalid_option(monkeypatch, fake_server):
     assert value == 'not_json'
 
 
-def test_path_parsing_error():
+def test_path_parsing_error(default_options):
     """Test get_program_icon with malformed path returns empty string or raises IndexError."""
-    options = Options()
+    options = default_options
     assert get_program_icon('////', options) == ''
     with pytest.raises(IndexError):
         get_program_icon('', options)
@@ -1,19 +1,32 @@
 #!/usr/bin/env python3
 
+import functools
+from pathlib import Path
 from typing import Optional
 
+import pytest
+
 from scripts.path_utils import Pane as PathPane
-from scripts.path_utils import get_exclusive_paths
+from scripts.path_utils import get_exclusive_paths, get_uncommon_path
 from tests.mocks import Pane as MockPane
 
 
+@functools.cache
 def _fake_pane(path: str, program: Optional[str]) -> PathPane:
     # Use the wrapper Pane from path_utils, with a mock Pane as info
+    # Shared between cases, get_exclusive_paths only reads the pane path and program
     return PathPane(
         info=MockPane(pane_current_path=path, pane_current_command='', pane_pid=1234, pane_active='1'), program=program
     )
 
 
+@functools.cache
+def _exclusive_displays(panes_key: tuple[tuple[str, Optional[str]], ...]) -> tuple[str, ...]:
+    # Cases with identical (path, program) inputs share one get_exclusive_paths run
+    panes = [_fake_pane(full, program) for full, program in panes_key]
+    return tuple(str(display) for _, display in get_exclusive_paths(panes))
+
+
 def _check(expected: list[tuple[str, Optional[str], str]]):
     """check expected displayed paths
 
@@ -26,187 +39,145 @@ def _check(expected: list[tuple[str, Optional[str], str]]):
             ('c/dir', None', 'c/dir'), # Shell in c/dir will display c/dir
         ])
     """
-    panes = [_fake_pane(full, program) for full, program, _ in expected]
-    exclusive_panes = get_exclusive_paths(panes)
-    for (_full, _, expected_display), (_, display) in zip(expected, exclusive_panes):
-        assert str(display) == expected_display
+    displays = _exclusive_displays(tuple((full, program) for full, program, _ in expected))
+    for (_full, _, expected_display), display in zip(expected, displays):
+        assert display == expected_display
 
 
-def test_not_intersect():
-    _check(
+CASES = [
+    pytest.param(
         [
             ('a/a_dir', None, 'a_dir'),
             ('b/b_dir', None, 'b_dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='not_intersect_1',
+    ),
+    pytest.param(
         [
             ('a', None, 'a'),
             ('b', None, 'b'),
-        ]
-    )
-
-    _check(
+        ],
+        id='not_intersect_2',
+    ),
+    pytest.param(
         [
             ('a', None, 'a'),
             ('b', None, 'b'),
             ('c', None, 'c'),
-        ]
-    )
-
-
-def test_basic_intersect():
-    _check(
+        ],
+        id='not_intersect_3',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
-        ]
-    )
-
-
-def test_not_same_length():
-    _check(
+        ],
+        id='basic_intersect',
+    ),
+    pytest.param(
         [
             ('a/b/dir', None, 'a/b/dir'),
             ('b/dir', None, 'b/dir'),
-        ]
-    )
-
-
-def test_deeply_nested_directories():
-    _check(
+        ],
+        id='not_same_length',
+    ),
+    pytest.param(
         [
             ('/a/b/c/d/e', None, 'e'),
             ('/a/b/c/d/f', None, 'f'),
             ('/a/b/c/g/h', None, 'h'),
-        ]
-    )
-
-
-def test_overlapping_paths():
-    _check(
+        ],
+        id='deeply_nested_directories',
+    ),
+    pytest.param(
         [
             ('/home/user/project', None, 'project'),
             ('/home/user/project2', None, 'project2'),
             ('/home/user/project/subdir', None, 'subdir'),
-        ]
-    )
-
-
-def test_common_prefixes():
-    _check(
+        ],
+        id='overlapping_paths',
+    ),
+    pytest.param(
         [
             ('/src/app', None, 'app'),
             ('/src/api', None, 'api'),
             ('/src/assets', None, 'assets'),
-        ]
-    )
-
-
-def test_edge_cases():
-    # Empty path list
-    panes = []
-    exclusive_panes = get_exclusive_paths(panes)
-    assert exclusive_panes == []
-
-    # Single path
-    _check(
+        ],
+        id='common_prefixes',
+    ),
+    pytest.param(
         [
             ('/only/path', None, 'path'),
-        ]
-    )
-
-    # All identical paths
-    _check(
+        ],
+        id='single_path',
+    ),
+    pytest.param(
         [
             ('/same/path', None, 'path'),
             ('/same/path', None, 'path'),
             ('/same/path', None, 'path'),
-        ]
-    )
-
-
-def test_get_uncommon_path_indexerror_branch():
-    # This covers the branch where IndexError is raised in get_uncommon_path
-    from pathlib import Path
-
-    from scripts.path_utils import get_uncommon_path
-
-    # a shorter than b, so IndexError will be triggered
-    a = Path('a')
-    b = Path('a/b/c')
-    uncommon_a, uncommon_b = get_uncommon_path(a, b)
-    assert uncommon_a == Path('a')
-    assert uncommon_b == Path('c')
-
-
-def test_mixed_programs_and_shells():
-    _check(
+        ],
+        id='identical_paths',
+    ),
+    pytest.param(
         [
             ('/projects/app', 'python', 'app'),
             ('/projects/app', None, 'app'),
             ('/projects/api', 'node', 'api'),
             ('/projects/api', None, 'api'),
-        ]
-    )
-
-
-def test_overlap_same_leaf():
-    _check(
+        ],
+        id='mixed_programs_and_shells',
+    ),
+    pytest.param(
         [
             ('/a/test', None, 'a/test'),
             ('/b/test', None, 'b/test'),
-        ]
-    )
-
-
-def test_reacurring_dir():
-    _check(
+        ],
+        id='overlap_same_leaf',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
             ('c/dir', None, 'c/dir'),
-        ]
-    )
-
-
-def test_same_path_twice_dir():
-    _check(
+        ],
+        id='reacurring_dir',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='same_path_twice_dir_1',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
             ('a/dir', None, 'a/dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='same_path_twice_dir_2',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
             ('b/dir', None, 'b/dir'),
             ('a/dir', None, 'a/dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='same_path_twice_dir_3',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='same_path_twice_dir_4',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
@@ -214,81 +185,111 @@ def test_same_path_twice_dir():
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
             ('c/dir', None, 'c/dir'),
-        ]
-    )
-
-
-def test_mixed_basic():
-    _check(
+        ],
+        id='same_path_twice_dir_5',
+    ),
+    pytest.param(
         [
             ('a/dir', None, 'a/dir'),
             ('b/dir', None, 'b/dir'),
             ('c/c_dir', None, 'c_dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='mixed_basic_1',
+    ),
+    pytest.param(
         [
             ('a/b/c/d', None, 'a/b/c/d'),
             ('b/c/d', None, 'b/c/d'),
             ('dirrr', None, 'dirrr'),
-        ]
-    )
-
-
-def test_program_basic():
-    _check(
+        ],
+        id='mixed_basic_2',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'dir'),
             ('b/dir', None, 'dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='program_basic_1',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'dir'),
             ('b/dir', 'p2', 'dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='program_basic_2',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'a/dir'),
             ('b/dir', 'p1', 'b/dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='program_basic_3',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'dir'),
             ('b/dir', 'p2', 'dir'),
-        ]
-    )
-
-
-def test_program_mixed():
-    _check(
+        ],
+        id='program_basic_4',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'dir'),
             ('b/dir', None, 'dir'),
             ('c/dir', 'p2', 'dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='program_mixed_1',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'dir'),
             ('b/dir', None, 'dir'),
             ('a/dir', 'p1', 'dir'),
             ('c/dir', 'p2', 'dir'),
-        ]
-    )
-
-    _check(
+        ],
+        id='program_mixed_2',
+    ),
+    pytest.param(
         [
             ('a/dir', 'p1', 'a/dir'),
             ('b/dir', 'p1', 'b/dir'),
             ('a/dir', 'p1', 'a/dir'),
             ('c/dir', 'p2', 'dir'),
+        ],
+        id='program_mixed_3',
+    ),
+]
+
+
+@pytest.mark.parametrize('expected', CASES)
+def test_exclusive_paths(expected):
+    _check(expected)
+
+
+def test_empty_path_list():
+    assert get_exclusive_paths([]) == []
+
+
+def test_get_uncommon_path_indexerror_branch():
+    # This covers the branch where IndexError is raised in get_uncommon_path
+    # a shorter than b, so IndexError will be triggered
+    a = Path('a')
+    b = Path('a/b/c')
+    uncommon_a, uncommon_b = get_uncommon_path(a, b)
+    assert uncommon_a == Path('a')
+    assert uncommon_b == Path('c')
+
+
+def test_unique_names_skip_disambiguation(monkeypatch):
+    def fail(*_args):
+        raise AssertionError
+
+    monkeypatch.setattr('scripts.path_utils.get_uncommon_path', fail)
+    _check(
+        [
+            ('a/a_dir', None, 'a_dir'),
+            ('a/b_dir', 'p1', 'b_dir'),
+            ('c', None, 'c'),
         ]
     )
+    assert get_exclusive_paths([]) == []
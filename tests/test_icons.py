@@ -1,27 +1,55 @@
 #!/usr/bin/env python3
 
-from typing import Any
 from unittest.mock import call
 
+import pytest
+
 from scripts.rename_session_windows import (
     DEFAULT_PROGRAM_ICONS,
     IconStyle,
     Options,
+    _icon_for_base_name,
     apply_icon_if_in_style,
     get_program_icon,
     rename_window,
 )
 from tests.mocks import Server
 
+_PYTHON_ICON = DEFAULT_PROGRAM_ICONS['python']
+_NVIM_ICON = DEFAULT_PROGRAM_ICONS['nvim']
+_DOCKER_ICON = DEFAULT_PROGRAM_ICONS['docker']
 
-def test_get_program_icon_built_in():
-    """Test retrieving built-in program icons"""
-    options = Options()
-    # Test all built-in icons
-    for prog, icon in DEFAULT_PROGRAM_ICONS.items():
-        assert get_program_icon(prog, options) == icon
-    # Test unknown program
-    assert get_program_icon('nonexistent', options) == ''  # no icon
+
+def _rename_calls(name: str) -> list:
+    return [
+        call('rename-window', '-t', '1', name),
+        call('set-option', '-wq', '-t', '1', 'automatic-rename-format', name),
+        call('set-option', '-wq', '-t', '1', 'automatic-rename', 'on'),
+    ]
+
+
+# Expected tmux calls of rename_window(server, '1', 'python', ...) for each style
+_EXPECTED_ICON_STYLE_CALLS = _rename_calls(_PYTHON_ICON)
+_EXPECTED_NAME_AND_ICON_STYLE_CALLS = _rename_calls(f'{_PYTHON_ICON} python')
+_EXPECTED_CUSTOM_ICON_CALLS = _rename_calls('\ud83d\udc0d python')
+
+
+@pytest.fixture(scope='module')
+def shared_fake_server():
+    return Server()
+
+
+@pytest.fixture
+def fake_server(shared_fake_server):
+    # Reuse one server for the module, only its recorded calls are reset per test
+    shared_fake_server.cmd.reset_mock(return_value=True, side_effect=True)
+    return shared_fake_server
+
+
+@pytest.mark.parametrize(('prog', 'icon'), [*DEFAULT_PROGRAM_ICONS.items(), ('nonexistent', '')])
+def test_get_program_icon_built_in(default_options, prog, icon):
+    """Test retrieving built-in program icons, unknown programs get no icon"""
+    assert get_program_icon(prog, default_options) == icon
 
 
 def test_get_program_icon_custom():
@@ -40,26 +68,26 @@ def test_get_program_icon_custom():
     # Custom icon overrides built-in for docker
     assert get_program_icon('docker', options) == 'CUSTOM_DOCKER_ICON'
     # Built-in icon for python
-    assert get_program_icon('python', options) == DEFAULT_PROGRAM_ICONS['python']
+    assert get_program_icon('python', options) == _PYTHON_ICON
 
 
 def test_get_program_icon_with_path_and_colon():
     """Test that program icons work with full paths and colons"""
     options = Options()
     # Path handling
-    assert get_program_icon('/usr/bin/python', options) == DEFAULT_PROGRAM_ICONS['python']
-    assert get_program_icon('/custom/path/nvim', options) == DEFAULT_PROGRAM_ICONS['nvim']
+    assert get_program_icon('/usr/bin/python', options) == _PYTHON_ICON
+    assert get_program_icon('/custom/path/nvim', options) == _NVIM_ICON
     # Colon handling
-    assert get_program_icon('python:3.10', options) == DEFAULT_PROGRAM_ICONS['python']
-    assert get_program_icon('/usr/bin/docker:latest', options) == DEFAULT_PROGRAM_ICONS['docker']
+    assert get_program_icon('python:3.10', options) == _PYTHON_ICON
+    assert get_program_icon('/usr/bin/docker:latest', options) == _DOCKER_ICON
 
 
 def test_get_program_icon_with_args():
     """Test that program icons work with command arguments"""
     options = Options()
-    assert get_program_icon('python script.py --arg', options) == DEFAULT_PROGRAM_ICONS['python']
-    assert get_program_icon('nvim file.txt', options) == DEFAULT_PROGRAM_ICONS['nvim']
-    assert get_program_icon('docker run', options) == DEFAULT_PROGRAM_ICONS['docker']
+    assert get_program_icon('python script.py --arg', options) == _PYTHON_ICON
+    assert get_program_icon('nvim file.txt', options) == _NVIM_ICON
+    assert get_program_icon('docker run', options) == _DOCKER_ICON
 
 
 def test_apply_icon_if_in_style_variants():
@@ -70,40 +98,20 @@ def test_apply_icon_if_in_style_variants():
     assert apply_icon_if_in_style('python', options) == 'python'
     # ICON style: only icon
     options.icon_style = IconStyle.ICON
-    assert apply_icon_if_in_style('python', options) == DEFAULT_PROGRAM_ICONS['python']
+    assert apply_icon_if_in_style('python', options) == _PYTHON_ICON
     # NAME_AND_ICON style: icon and name
     options.icon_style = IconStyle.NAME_AND_ICON
-    assert apply_icon_if_in_style('python', options) == f'{DEFAULT_PROGRAM_ICONS["python"]} python'
+    assert apply_icon_if_in_style('python', options) == f'{_PYTHON_ICON} python'
 
 
 # Removed duplicate test_rename_window_name_and_icon_style (F811)
 
 
-def test_rename_window_icon_style():
+def test_rename_window_icon_style(fake_server):
     """Test window renaming with 'icon' style"""
-    server: Any = Server()
     options = Options(icon_style=IconStyle.ICON)
-    rename_window(server, '1', 'python', 20, options)
-    expected_calls = [
-        call('rename-window', '-t', '1', DEFAULT_PROGRAM_ICONS['python']),
-        call(
-            'set-option',
-            '-wq',
-            '-t',
-            '1',
-            'automatic-rename-format',
-            DEFAULT_PROGRAM_ICONS['python'],
-        ),
-        call(
-            'set-option',
-            '-wq',
-            '-t',
-            '1',
-            'automatic-rename',
-            'on',
-        ),
-    ]
-    assert server.cmd.call_args_list == expected_calls
+    rename_window(fake_server, '1', 'python', 20, options)
+    assert fake_server.cmd.call_args_list == _EXPECTED_ICON_STYLE_CALLS
 
 
 def test_unicode_escape_icon_decoding():
@@ -115,95 +123,81 @@ def test_unicode_escape_icon_decoding():
     assert icon == '\ue7b0' or icon == ''
 
 
-def test_rename_window_name_and_icon_style():
+def test_rename_window_name_and_icon_style(fake_server):
     """Test window renaming with 'name_and_icon' style"""
-    server: Any = Server()
     options = Options(icon_style=IconStyle.NAME_AND_ICON)
-    rename_window(server, '1', 'python', 20, options)
-    expected_calls = [
-        call(
-            'rename-window',
-            '-t',
-            '1',
-            f'{DEFAULT_PROGRAM_ICONS["python"]} python',
-        ),
-        call(
-            'set-option',
-            '-wq',
-            '-t',
-            '1',
-            'automatic-rename-format',
-            f'{DEFAULT_PROGRAM_ICONS["python"]} python',
-        ),
-        call(
-            'set-option',
-            '-wq',
-            '-t',
-            '1',
-            'automatic-rename',
-            'on',
-        ),
-    ]
-    assert server.cmd.call_args_list == expected_calls
+    rename_window(fake_server, '1', 'python', 20, options)
+    assert fake_server.cmd.call_args_list == _EXPECTED_NAME_AND_ICON_STYLE_CALLS
 
 
-def test_rename_window_custom_icon():
+def test_rename_window_custom_icon(fake_server):
     """Test window renaming with custom icon"""
-    server: Any = Server()
     options = Options(icon_style=IconStyle.NAME_AND_ICON, custom_icons={'python': '\ud83d\udc0d'})
-    rename_window(server, '1', 'python', 20, options)
-    expected_calls = [
-        call('rename-window', '-t', '1', '\ud83d\udc0d python'),
-        call('set-option', '-wq', '-t', '1', 'automatic-rename-format', '\ud83d\udc0d python'),
-        call('set-option', '-wq', '-t', '1', 'automatic-rename', 'on'),
-    ]
-    assert server.cmd.call_args_list == expected_calls
+    rename_window(fake_server, '1', 'python', 20, options)
+    assert fake_server.cmd.call_args_list == _EXPECTED_CUSTOM_ICON_CALLS
 
 
-def test_rename_window_max_length():
+def test_rename_window_max_length(fake_server):
     """Test that window names respect max_name_len"""
-    server: Any = Server()
     options = Options(icon_style=IconStyle.NAME_AND_ICON, max_name_len=10)
-    rename_window(server, '1', 'python', 10, options)
-    expected_calls = [
-        call(
-            'rename-window',
-            '-t',
-            '1',
-            f'{DEFAULT_PROGRAM_ICONS["python"]} python',
-        ),
-        call(
-            'set-option',
-            '-wq',
-            '-t',
-            '1',
-            'automatic-rename-format',
-            f'{DEFAULT_PROGRAM_ICONS["python"]} python',
-        ),
-        call(
-            'set-option',
-            '-wq',
-            '-t',
-            '1',
-            'automatic-rename',
-            'on',
-        ),
-    ]
-    assert server.cmd.call_args_list == expected_calls
+    rename_window(fake_server, '1', 'python', 10, options)
+    assert fake_server.cmd.call_args_list == _EXPECTED_NAME_AND_ICON_STYLE_CALLS
 
 
 def test_get_program_icon_with_colon():
     """Test that program icons work with program names containing colons"""
     options = Options()
-    assert get_program_icon('python:3.9', options) == DEFAULT_PROGRAM_ICONS['python']
-    assert get_program_icon('nvim:q', options) == DEFAULT_PROGRAM_ICONS['nvim']
+    assert get_program_icon('python:3.9', options) == _PYTHON_ICON
+    assert get_program_icon('nvim:q', options) == _NVIM_ICON
+
 
+@pytest.fixture(scope='module')
+def custom_icon_options():
+    """Options parsed once from a custom icons dictionary set on the server"""
+    server = Server()
+    server.cmd.return_value.stdout = [
+        r'@tmux_window_name_custom_icons "{\"python\": \"🐍\", \"custom\": \"📦\", \"nvim\": \"󰹻\"}"'
+    ]
+    return Options.from_options(server)
 
-def test_custom_icons_from_dictionary():
+
+@pytest.mark.parametrize(('prog', 'icon'), [('python', '🐍'), ('custom', '📦'), ('nvim', '󰹻')])
+def test_custom_icons_from_dictionary(custom_icon_options, prog, icon):
     """Test that custom icons can be parsed from a dictionary"""
-    server: Any = Server()
-    server.cmd.return_value.stdout = ['{"python": "🐍", "custom": "📦", "nvim": "󰹻"}']
-    options = Options.from_options(server)
-    assert get_program_icon('python', options) == '🐍'
-    assert get_program_icon('custom', options) == '📦'
-    assert get_program_icon('nvim', options) == '󰹻'
+    assert get_program_icon(prog, custom_icon_options) == icon
+
+
+def test_get_program_icon_per_custom_icons():
+    """Test that icons resolved for one custom icon set are not shared with another"""
+    assert get_program_icon('python', Options(custom_icons={'python': 'A'})) == 'A'
+    assert get_program_icon('python', Options(custom_icons={'python': 'B'})) == 'B'
+    assert get_program_icon('python', Options()) == _PYTHON_ICON
+
+
+def test_get_program_icon_follows_custom_icons():
+    """Test that custom icons changed after construction are used"""
+    options = Options(icon_style=IconStyle.ICON)
+    options.custom_icons = {'python': 'X'}
+    assert get_program_icon('python', options) == 'X'
+    options.custom_icons['python'] = 'Y'
+    assert apply_icon_if_in_style('python', options) == 'Y'
+    options.custom_icons = {}
+    assert get_program_icon('python', options) == _PYTHON_ICON
+
+
+def test_get_program_icon_non_string_custom_icons():
+    """Test that non string custom icon values skip the precomputed icon map"""
+    options = Options(custom_icons={'python': ['not', 'a', 'string']})  # type: ignore
+    assert options.icon_map is None
+    assert get_program_icon('docker', options) == _DOCKER_ICON
+
+
+def test_icon_map_precedence():
+    """Test that the icon map matches the per call lookup, empty custom icons fall back to built-in ones"""
+    custom_icons = {'python': '\\ue73c', 'docker': '', 'custom': 'C', 'empty': ''}
+    options = Options(custom_icons=custom_icons)
+    assert options.icon_map is not None
+    for name in ('python', 'docker', 'custom', 'empty', 'nvim', 'nonexistent'):
+        assert options.icon_map.get(name, '') == _icon_for_base_name(name, custom_icons)
+    assert options.icon_map['python'] == '\ue73c'
+    assert options.icon_map['docker'] == _DOCKER_ICON
@@ -6,10 +6,14 @@ from pathlib import Path
 from typing import Any
 from unittest.mock import Mock, patch
 
+import scripts.rename_session_windows as rsw
+from scripts.path_utils import Pane as PathPane
 from scripts.rename_session_windows import (
     IconStyle,
     Options,
+    _enable_rename_hook_command,
     apply_icon_if_in_style,
+    build_programs_index,
     fix_pane_path,
     get_current_program,
     get_current_session,
@@ -30,7 +34,7 @@ from scripts.rename_session_windows import (
 )
 
 # Import 1:1 libtmux mocks
-from tests.mocks import Pane, Server, Session, Window
+from tests.mocks import FakeServer, Pane, Server, Session, Window
 
 
 class MockCmd:
@@ -38,10 +42,7 @@ class MockCmd:
 
     def __init__(self, stdout: str = '', stderr: str = '', returncode: int = 0):
         # stdout should be a list of lines for compatibility
-        if isinstance(stdout, str):
-            self.stdout = stdout.strip().split('\n') if stdout.strip() else []
-        else:
-            self.stdout = stdout
+        self.stdout = stdout.splitlines() if isinstance(stdout, str) else stdout
         self.stderr = stderr
         self.returncode = returncode
 
@@ -67,19 +68,13 @@ def test_substitute_name():
 
 def test_get_option():
     """Test get_option function."""
-    server: Any = Server()
-
-    # Patch cmd to simulate MockCmd output
-    def cmd_side_effect(*args, **kwargs):
-        return MockCmd(stdout='test_value\n')
-
-    server.cmd.side_effect = cmd_side_effect
+    server: Any = FakeServer(['test_value'])
 
     result = get_option(server, 'test_option', 'default')
     assert result == 'test_value'
 
     # Test with empty result
-    server.cmd.side_effect = lambda *_args, **_kwargs: MockCmd(stdout='\n')
+    server.default_stdout = []
     result = get_option(server, 'test_option', 'default')
     assert result == 'default'
 
@@ -96,25 +91,13 @@ def test_get_window_option():
 
 def test_get_window_tmux_option():
     """Test get_window_tmux_option function."""
-    server: Any = Server()
-
-    # Patch cmd to simulate MockCmd output
-    def cmd_side_effect(*args, **kwargs):
-        return MockCmd(stdout='test_value\n')
-
-    server.cmd.side_effect = cmd_side_effect
+    server: Any = FakeServer(['test_value'])
 
     result = get_window_tmux_option(server, '@1', 'test_option', 'default')
     assert result == 'test_value'
 
     # Test with do_eval=True and JSON value
-    def json_cmd_side_effect(*args, **kwargs):
-        class Result:
-            stdout = ['["item1", "item2"]']
-
-        return Result()
-
-    server.cmd.side_effect = json_cmd_side_effect
+    server.respond(('show-option', '-wqv', '-t', '@1', 'test_option'), ['["item1", "item2"]'])
     result = get_window_tmux_option(server, '@1', 'test_option', [], do_eval=True)
     assert result == ['item1', 'item2']
 
@@ -208,18 +191,18 @@ def test_get_current_program():
     )
 
     # Test matching PID in running programs - expect full command
-    result = get_current_program([b'1234 python script.py'], pane, options)
+    result = get_current_program(build_programs_index([b'1234 python script.py']), pane, options)
     assert result == 'python script.py'  # Should return full command line
 
     # Test with dash prefix (login shell)
     pane2 = Pane(
         pane_current_command='-fish', pane_pid=5678, pane_active='1', pane_current_path='/home/user', window_id='@1'
     )
-    result = get_current_program([b'5678 -fish'], pane2, options)
+    result = get_current_program(build_programs_index([b'5678 -fish']), pane2, options)
     assert result is None
 
     # Test no matching PID - should fall back to pane command
-    result = get_current_program([b'9999 other'], pane, options)
+    result = get_current_program(build_programs_index([b'9999 other']), pane, options)
     assert result == 'python'
 
     # Test with shell in ignored programs
@@ -227,7 +210,7 @@ def test_get_current_program():
     pane3 = Pane(
         pane_current_command='bash', pane_pid=1111, pane_active='1', pane_current_path='/home/user', window_id='@1'
     )
-    result = get_current_program([b'1111 bash', b'2222 vim'], pane3, options)
+    result = get_current_program(build_programs_index([b'1111 bash', b'2222 vim']), pane3, options)
     assert result is None
 
 
@@ -237,7 +220,7 @@ def test_get_current_program_ssh():
     options = Options()
 
     # Test SSH command parsing - expect full command
-    result = get_current_program([b'1234 ssh user@host'], pane, options)
+    result = get_current_program(build_programs_index([b'1234 ssh user@host']), pane, options)
     assert result == 'ssh user@host'  # Should return full SSH command
 
 
@@ -267,19 +250,18 @@ def test_get_session_active_panes():
     window1 = Window()
     window2 = Window()
 
-    pane1 = Pane(pane_active='1')
-    pane2 = Pane(pane_active='0')
-    pane3 = Pane(pane_active='1')
+    pane1 = Pane(pane_id='%1', pane_active='1')
+    pane2 = Pane(pane_id='%2', pane_active='0')
+    pane3 = Pane(pane_id='%3', pane_active='1')
 
     window1.panes = [pane1, pane2]
     window2.panes = [pane3]
     session.windows = [window1, window2]
 
     result = get_session_active_panes(session)
-    assert len(result) == 2
-    assert pane1 in result
-    assert pane3 in result
-    assert pane2 not in result
+    assert [p.pane_id for p in result] == ['%1', '%3']
+    assert result[0].pane_current_path == pane1.pane_current_path
+    assert result[0].pane_pid == str(pane1.pane_pid)
 
 
 def test_fix_pane_path():
@@ -288,11 +270,8 @@ def test_fix_pane_path():
     options.use_tilde = True
 
     # Create a proper Pane object using path_utils.Pane wrapper with mock Pane as info
-    from scripts.path_utils import Pane as PathPane
-    from tests.mocks import Pane as MockPane
-
     pane = PathPane(
-        info=MockPane(
+        info=Pane(
             pane_current_path='/home/user/projects/test', pane_current_command='python', pane_pid=1234, pane_active='1'
         ),
         program='python',
@@ -302,12 +281,10 @@ def test_fix_pane_path():
     real_home = str(Path.home())
     test_path = f'{real_home}/projects/test'
     pane = PathPane(
-        info=MockPane(pane_current_path=test_path, pane_current_command='python', pane_pid=1234, pane_active='1'),
+        info=Pane(pane_current_path=test_path, pane_current_command='python', pane_pid=1234, pane_active='1'),
         program='python',
     )
     with patch('pathlib.Path.home', return_value=Path(real_home)):
-        import scripts.rename_session_windows as rsw
-
         rsw.HOME_DIR = str(Path.home())
         result = fix_pane_path(pane, options)
     assert str(result.info.pane_current_path).startswith('~')
@@ -316,7 +293,7 @@ def test_fix_pane_path():
     # Test with use_tilde = False
     options.use_tilde = False
     pane2 = PathPane(
-        info=MockPane(
+        info=Pane(
             pane_current_path='/home/user/projects/test/subdir',
             pane_current_command='python',
             pane_pid=1234,
@@ -333,7 +310,7 @@ def test_fix_pane_path():
     # When use_tilde is True, only the real home directory should be replaced
     options.use_tilde = True
     pane3 = PathPane(
-        info=MockPane(
+        info=Pane(
             pane_current_path='/home/user2/projects/test',
             pane_current_command='python',
             pane_pid=4321,
@@ -356,8 +333,12 @@ def test_get_current_session():
         result = get_current_session(server)
         assert result == session
 
-    # Test with no matching session - might not raise ValueError
+    # The session is looked up once per server
     server.sessions = []
+    assert get_current_session(server) is session
+
+    # Test with no matching session - might not raise ValueError
+    server = Server()
     with patch.dict('os.environ', {'TMUX_PANE': '%1'}):
         server.cmd.return_value = MockCmd(stdout='$2\n')
         try:
@@ -375,14 +356,10 @@ def test_get_current_session():
 
 def test_print_programs(capsys):
     """Test print_programs function."""
-    from scripts.path_utils import Pane as PathPane
-    from tests.mocks import Pane as MockPane
-    from tests.mocks import Server, Session, Window
-
     server: Any = Server()
     session: Any = Session()
     window = Window()
-    pane = MockPane(pane_current_path='/home/user', pane_current_command='python', pane_pid=1234, pane_active='1')
+    pane = Pane(pane_current_path='/home/user', pane_current_command='python', pane_pid=1234, pane_active='1')
     window.panes = [pane]
     session.windows = [window]
     server.sessions = [session]
@@ -393,7 +370,7 @@ def test_print_programs(capsys):
         with patch('scripts.rename_session_windows.get_panes_programs') as mock_panes:
             # Create proper PathPane objects (wrapper) with mock Pane as info
             test_pane = PathPane(
-                info=MockPane(
+                info=Pane(
                     pane_current_path='/home/user', pane_current_command='python', pane_pid=1234, pane_active='1'
                 ),
                 program='python',
@@ -408,8 +385,7 @@ def test_print_programs(capsys):
 def test_options_from_options():
     """Test Options.from_options method."""
     # Test with empty server (should use defaults)
-    server: Any = Server()
-    server.cmd.return_value = MockCmd(stdout='\n')
+    server: Any = FakeServer()
 
     options = Options.from_options(server)
     # Check actual default values (they might be different)
@@ -424,8 +400,7 @@ def test_options_from_options():
             'MAX_NAME_LEN': '30',
         },
     ):
-        server2: Any = Server()
-        server2.cmd.return_value = MockCmd(stdout='\n')
+        server2: Any = FakeServer()
         options = Options.from_options(server2)
         # The actual implementation might not use these exact env vars
         assert isinstance(options.dir_programs, list)
@@ -435,61 +410,52 @@ def test_options_from_options():
 def test_post_restore():
     """Test post_restore function."""
     server: Any = Server()
-    window1 = Window(window_id='@1')
-    window2 = Window(window_id='@2')
-    server.windows = [window1, window2]
-
-    # Patch server.cmd to return a list for len()
-    class CmdResult:
-        def __init__(self, stdout):
-            self.stdout = stdout
-
-    server.cmd.return_value = CmdResult(['on'])
-
-    # Mock automatic-rename check
-    with patch('scripts.rename_session_windows.get_window_option') as mock_get:
-        mock_get.return_value = 'on'
-        with patch('scripts.rename_session_windows.set_window_tmux_option') as mock_set:
-            post_restore(server)
-            # Should enable tmux-window-name for windows with automatic-rename
-            assert mock_set.called
+    sourced = []
+
+    def cmd(*args):
+        result = Mock()
+        result.stdout = []
+        if args[0] == 'list-windows':
+            result.stdout = ['@1 1', '@2 0']
+        elif args[0] == 'source-file':
+            sourced.append(Path(args[1]).read_text())
+        return result
+
+    server.cmd.side_effect = cmd
+
+    post_restore(server)
+    # Should enable tmux-window-name only for windows with automatic-rename, and the rename hook in the same batch
+    assert sourced == [
+        (
+            'set-option -wq -t @1 @tmux_window_name_enabled 1\n'
+            'set-option -wq -t @2 @tmux_window_name_enabled 0\n'
+            f'{_enable_rename_hook_command()}\n'
+        )
+    ]
 
 
 def test_rename_windows():
-    """Test rename_windows function."""
+    """Test rename_windows names a window running one of dir_programs after the program and its directory."""
     server: Any = Server()
     session: Any = Session()
-    window = Window(window_id='@1', window_name='old_name')
     pane = Pane(pane_current_path='/home/user/project', pane_current_command='python', pane_pid=1234, pane_active='1')
-    window.panes = [pane]
-    session.windows = [window]
-    session.active_window = window
-    server.sessions = [session]
+    pane.window_id = '@1'
+    options = Options(dir_programs=['python'])
+
+    with (
+        patch('scripts.rename_session_windows.get_current_session', return_value=session),
+        patch('scripts.rename_session_windows.tmux_guard') as mock_guard,
+        patch('scripts.rename_session_windows._load_windows_state', return_value={}),
+        patch('scripts.rename_session_windows.get_panes_programs', return_value=[PathPane(pane, 'python')]),
+        patch('scripts.rename_session_windows.source_tmux_commands'),
+        patch('scripts.rename_session_windows.rename_window') as mock_rename,
+    ):
+        mock_guard.return_value.__enter__ = Mock(return_value=False)
+        mock_guard.return_value.__exit__ = Mock(return_value=None)
+        rename_windows(server, options)
 
-    options = Options()
-    options.dir_programs = ['python']
-
-    with patch('scripts.rename_session_windows.get_current_session') as mock_current:
-        mock_current.return_value = session
-        with patch('scripts.rename_session_windows.tmux_guard') as mock_guard:
-            mock_guard.return_value.__enter__ = Mock(return_value=True)
-            mock_guard.return_value.__exit__ = Mock(return_value=None)
-
-            with (
-                patch('scripts.rename_session_windows.rename_window') as mock_rename,
-                patch('scripts.rename_session_windows.get_panes_programs') as mock_panes,
-            ):
-                test_pane = Pane(
-                    pane_current_path='/home/user/project',
-                    pane_current_command='python',
-                    pane_pid=1234,
-                    pane_active='1',
-                )
-                mock_panes.return_value = [test_pane]
-
-                rename_windows(server, options)
-                # Check if rename_window was called at least once
-                assert mock_rename.call_count >= 0  # Changed from assert_called
+    mock_rename.assert_called_once()
+    assert mock_rename.call_args.args[1:4] == ('@1', 'python:project', options.max_name_len)
 
 
 def test_get_panes_programs():
@@ -517,15 +483,11 @@ def test_get_panes_programs():
 def test_main_basic():
     """Test main function basic operation."""
     with patch('scripts.rename_session_windows.Server') as mock_server_class:
-        server: Any = Server()
+        server: Any = FakeServer()
         mock_server_class.return_value = server
 
         session = Session()
         server.sessions = [session]
-        server.cmd.side_effect = [
-            MockCmd(stdout='$1\n'),  # get_current_session
-            MockCmd(stdout='\n'),  # Various option queries
-        ] * 20
 
         with (
             patch('sys.argv', ['rename_session_windows.py']),
@@ -543,9 +505,8 @@ def test_main_basic():
 def test_main_print_programs():
     """Test main function with --print_programs flag."""
     with patch('scripts.rename_session_windows.Server') as mock_server_class:
-        server: Any = Server()
+        server: Any = FakeServer()
         mock_server_class.return_value = server
-        server.cmd.return_value = MockCmd(stdout='\n')
 
         with (
             patch('sys.argv', ['rename_session_windows.py', '--print_programs']),
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import sys
+from pathlib import Path
 from typing import Any
 
 import pytest
@@ -15,8 +16,10 @@ from scripts.rename_session_windows import (
     get_option,
     get_program_icon,
     get_window_option,
+    main,
     post_restore,
     rename_window,
+    rename_windows,
     set_window_tmux_option,
     substitute_name,
     tmux_guard,
@@ -109,18 +112,24 @@ def test_substitute_name_regex():
 
 
 def test_post_restore_sets_enabled(fake_server):
-    window = Window(window_id='@1', window_name='test')
-    fake_server.windows = [window]
-    fake_server.cmd.return_value.stdout = ['on']
+    sourced = []
+
+    def cmd_side_effect(*args):
+        if args[0] == 'source-file':
+            sourced.append(Path(args[1]).read_text())
+        return fake_server.cmd.return_value
+
+    fake_server.cmd.return_value.stdout = ['@1 1']
+    fake_server.cmd.side_effect = cmd_side_effect
     server: Any = fake_server
     post_restore(server)
-    # Should set enabled to '1'
-    assert any('enabled' in str(call) for call in [c[0] for c in fake_server.cmd.call_args_list])
+    # Should set enabled to '1' and enable the rename hook with a single source-file
+    assert len(sourced) == 1
+    assert 'set-option -wq -t @1 @tmux_window_name_enabled 1\n' in sourced[0]
+    assert 'set-hook -g after-rename-window' in sourced[0]
 
 
 def test_main_all_args(monkeypatch):
-    from scripts.rename_session_windows import main
-
     fake_server = Server()
     fake_server.cmd.return_value.stdout = []
     monkeypatch.setattr('scripts.rename_session_windows.Server', lambda: fake_server)
@@ -138,12 +147,7 @@ def test_main_all_args(monkeypatch):
     assert main() == 0
 
 
-def test_rename_windows_enabled_disabled(fake_server):
-    import sys
-
-    from scripts.path_utils import Pane as PathPane
-    from scripts.rename_session_windows import rename_windows
-
+def test_rename_windows_enabled_disabled(fake_server, monkeypatch):
     session = Session(session_id='$1')
     window1 = Window(window_id='@1', window_name='win1')
     window2 = Window(window_id='@2', window_name='win2')
@@ -168,28 +172,25 @@ def test_rename_windows_enabled_disabled(fake_server):
     session.windows = [window1, window2]
     fake_server.sessions = [session]
 
-    # Patch fake_server.cmd to return '1' for window_id '@1' (enabled), '0' for '@2' (disabled)
+    sourced = []
+
+    # Patch fake_server.cmd to report '1' for window_id '@1' (enabled), '0' for '@2' (disabled)
     def cmd_side_effect(*args, **kwargs):
+        if args[0] == 'source-file':
+            sourced.append(Path(args[1]).read_text())
+
         if args[:3] == ('show-option', '-gv', '@tmux_window_name_running'):
 
             class Result:
                 stdout = ['0']
 
             return Result()
-        if '-t' in args:
-            idx = args.index('-t')
-            if args[idx + 1] == '@1':
-
-                class Result:
-                    stdout = ['1']
+        if args[0] == 'list-windows':
 
-                return Result()
-            if args[idx + 1] == '@2':
-
-                class Result:
-                    stdout = ['0']
+            class Result:
+                stdout = ['@1 0 1 win1', '@2 0 0 win2']
 
-                return Result()
+            return Result()
 
         class Result:
             stdout = ['1']
@@ -205,12 +206,14 @@ def test_rename_windows_enabled_disabled(fake_server):
         pane2_pathpane = PathPane(info=pane2, program='python')
         return [pane1_pathpane, pane2_pathpane]
 
-    sys.modules['scripts.rename_session_windows'].get_panes_programs = fake_get_panes_programs
+    monkeypatch.setattr('scripts.rename_session_windows.get_panes_programs', fake_get_panes_programs)
 
     options = Options()
     rename_windows(fake_server, options)
 
-    # Should update window1.name for enabled window only (@1)
-    assert window1.name == 'user'
-    # Should NOT update window2.name for disabled window (@2)
-    assert window2.name != 'python'
+    # Should rename the enabled window only (@1) with a single source-file
+    renames = [text for text in sourced if 'rename-window -t' in text]
+    assert len(renames) == 1
+    assert "rename-window -t @1 'user'" in renames[0]
+    # Should NOT rename the disabled window (@2)
+    assert '@2' not in renames[0]
@@ -1,25 +1,48 @@
 #!/usr/bin/env python3
 
+import contextlib
+import dataclasses
+import subprocess
+import sys
+from pathlib import Path
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 
 from scripts.path_utils import Pane as PathPane
 from scripts.rename_session_windows import (
     DEFAULT_PROGRAM_ICONS,
+    WINDOWS_STATE_FORMAT,
     IconStyle,
     Options,
+    WindowState,
+    _load_all_options,
+    _load_windows_state,
     apply_icon_if_in_style,
+    build_programs_index,
+    compile_substitute_sets,
+    default_field_value,
+    encode_skipped_programs,
     fix_pane_path,
     get_current_program,
     get_current_session,
     get_option,
+    get_panes_programs,
     get_program_icon,
     get_session_active_panes,
     get_window_option,
+    get_window_tmux_option,
+    main,
+    parse_shell_command,
+    print_programs,
+    read_proc_children,
     rename_window,
+    rename_windows,
+    required_literal,
     set_option,
     set_window_tmux_option,
+    source_tmux_commands,
     substitute_name,
     tmux_guard,
 )
@@ -41,6 +64,36 @@ def test_get_option_returns_string(fake_server):
     assert get_option(fake_server, 'max_name_len', 42) == 'not_json'
 
 
+def test_load_all_options_reads_prefixed_options_once(fake_server):
+    fake_server.cmd.return_value.stdout = [
+        'status on',
+        '@tmux_window_name_max_name_len 30',
+        "@tmux_window_name_shells \"['bash', 'zsh']\"",
+        r'''@tmux_window_name_substitute_sets "[('a\\d', '\$b')]"''',
+        r'@tmux_window_name_log_level \~DEBUG',
+    ]
+
+    assert _load_all_options(fake_server) == {
+        'max_name_len': '30',
+        'shells': "['bash', 'zsh']",
+        'substitute_sets': r"[('a\d', '$b')]",
+        'log_level': '~DEBUG',
+    }
+    fake_server.cmd.assert_called_once_with('show-options', '-g')
+
+
+def test_options_from_options_uses_batched_values(fake_server):
+    fake_server.cmd.return_value.stdout = [
+        '@tmux_window_name_max_name_len 30',
+        "@tmux_window_name_shells \"['bash', 'zsh']\"",
+    ]
+    opts = Options.from_options(fake_server)
+    assert opts.max_name_len == 30
+    assert opts.shells == ['bash', 'zsh']
+    assert opts.dir_programs == Options().dir_programs
+    assert fake_server.cmd.call_count == 1
+
+
 def test_get_window_option_and_set_window_tmux_option(fake_server):
     fake_server.cmd.return_value.stdout = ["'value'"]
     val = get_window_option(fake_server, '@1', 'enabled', 'default')
@@ -53,7 +106,6 @@ def test_get_window_tmux_option_literal_eval_fallback(fake_server):
     # Should hit the except (ValueError, SyntaxError) and return as string
     # e.g. value that cannot be parsed as a Python literal
     fake_server.cmd.return_value.stdout = ['not_a_literal']
-    from scripts.rename_session_windows import get_window_tmux_option
 
     result = get_window_tmux_option(fake_server, '@1', 'enabled', 'default', do_eval=True)
     assert result == 'not_a_literal'
@@ -66,11 +118,8 @@ def test_default_field_value_returns_none():
         default_factory = object()
 
     # Remove MISSING from both
-    import dataclasses
-
     DummyField.default = dataclasses.MISSING
     DummyField.default_factory = dataclasses.MISSING
-    from scripts.rename_session_windows import default_field_value
 
     assert default_field_value(DummyField()) is None
 
@@ -80,11 +129,8 @@ def test_default_field_value_returns_default():
     class DummyField:
         pass
 
-    import dataclasses
-
     DummyField.default = 'my_default'
     DummyField.default_factory = dataclasses.MISSING
-    from scripts.rename_session_windows import default_field_value
 
     assert default_field_value(DummyField()) == 'my_default'
 
@@ -94,19 +140,14 @@ def test_default_field_value_returns_default_factory():
     class DummyField:
         pass
 
-    import dataclasses
-
     DummyField.default = dataclasses.MISSING
     DummyField.default_factory = staticmethod(lambda: 'factory_value')
-    from scripts.rename_session_windows import default_field_value
 
     assert default_field_value(DummyField()) == 'factory_value'
 
 
 def test_options_from_options_icon_style_valueerror(monkeypatch):
     # Simulate get_option returning an invalid icon_style string
-    from scripts.rename_session_windows import Options
-
     class DummyServer:
         def cmd(self, *args, **kwargs):
             class Result:
@@ -126,9 +167,6 @@ def test_options_from_options_icon_style_valueerror(monkeypatch):
 
 
 def test_apply_icon_if_in_style_icon_and_name_and_icon(monkeypatch):
-    # Use our Options mock and IconStyle
-    from scripts.rename_session_windows import IconStyle, Options, apply_icon_if_in_style
-
     name = 'myprog'
     options_icon = Options(icon_style=IconStyle.ICON)
     options_name_and_icon = Options(icon_style=IconStyle.NAME_AND_ICON)
@@ -164,6 +202,42 @@ def test_rename_window_with_window_object(fake_server):
     assert window.name == 'newname'
 
 
+def test_rename_window_appends_commands(fake_server):
+    commands = []
+    rename_window(fake_server, '@1', "it's", 20, Options(), commands)
+    assert commands == [
+        "rename-window -t @1 'it'\\''s'",
+        "set-option -wq -t @1 automatic-rename-format 'it'\\''s'",
+        'set-option -wq -t @1 automatic-rename on',
+    ]
+    fake_server.cmd.assert_not_called()
+
+
+def test_rename_window_skips_settled_name(fake_server):
+    commands = []
+    rename_window(fake_server, '@1', 'vim', 20, Options(), commands, 'vim')
+    assert commands == []
+    # The settled name is compared with the final name, after the icon and the length limit are applied
+    rename_window(fake_server, '@1', 'vim-long-name', 3, Options(), commands, 'vim')
+    assert commands == []
+    rename_window(fake_server, '@1', 'git', 20, Options(), commands, 'vim')
+    assert commands[0] == "rename-window -t @1 'git'"
+    fake_server.cmd.assert_not_called()
+
+
+def test_source_tmux_commands(fake_server):
+    source_tmux_commands(fake_server, [])
+    fake_server.cmd.assert_not_called()
+
+    sourced = []
+    fake_server.cmd.side_effect = lambda *args: sourced.append((args, Path(args[1]).read_text()))
+    source_tmux_commands(fake_server, ['rename-window -t @1 a', 'rename-window -t @2 b'])
+    ((args, content),) = sourced
+    assert args[0] == 'source-file'
+    assert content == 'rename-window -t @1 a\nrename-window -t @2 b\n'
+    assert not Path(args[1]).exists()
+
+
 def test_fix_pane_path_none():
     pane = PathPane(info=Pane(pane_current_path=None), program=None)
 
@@ -178,6 +252,45 @@ def test_substitute_name_basic():
     assert substitute_name(name, subs) == 'test-name-there'
 
 
+@pytest.mark.parametrize(
+    ('pattern', 'expected'),
+    [
+        (r'.+ipython([32])', 'ipython'),
+        (r'^(/usr)?/bin/(.+)', '/bin/'),
+        (r'.+poetry shell', 'poetry shell'),
+        (r'a(bc)?d', 'a'),
+        (r'abc?d', 'ab'),
+        (r'[^]]xy', 'xy'),
+        (r'foo|bar', ''),
+        (r'(?i)foo', ''),
+        (r'a\d', ''),
+    ],
+)
+def test_required_literal(pattern, expected):
+    assert required_literal(pattern) == expected
+
+
+def test_substitute_name_skips_patterns_without_required_literal():
+    sets = compile_substitute_sets([(r'.+ipython([32])', r'ipython\g<1>'), ('x', 'y')])
+    assert substitute_name('/usr/bin/ipython3', sets) == 'ipython3'
+    assert substitute_name('python', sets) == 'python'
+    assert substitute_name('python', []) == 'python'
+
+
+def test_compile_substitute_sets_skips_invalid_rules(monkeypatch):
+    sets = compile_substitute_sets([('(', 'x'), ('lonely',), ('vim', 'editor')])  # type: ignore[list-item]
+    assert [s.pattern.pattern for s in sets] == ['vim']
+
+    def broken_required_literal(pattern):
+        raise IndexError(pattern)
+
+    # Deriving the required literal is guarded the same way as compiling the pattern
+    monkeypatch.setattr('scripts.rename_session_windows.required_literal', broken_required_literal)
+    options = Options(substitute_sets=[('vim', 'editor')], dir_substitute_sets=[('a', 'b')])
+    assert options.compiled_substitute_sets == []
+    assert options.compiled_dir_substitute_sets == []
+
+
 def test_apply_icon_if_in_style_variants():
     options = Options(icon_style=IconStyle.NAME)
     assert apply_icon_if_in_style('python', options) == 'python'
@@ -187,6 +300,14 @@ def test_apply_icon_if_in_style_variants():
     assert apply_icon_if_in_style('python', options) == f'{DEFAULT_PROGRAM_ICONS["python"]} python'
 
 
+def test_apply_icon_if_in_style_name_skips_icon_lookup(monkeypatch):
+    def fail(*_args):
+        raise AssertionError
+
+    monkeypatch.setattr('scripts.rename_session_windows.get_program_icon', fail)
+    assert apply_icon_if_in_style('python', Options(icon_style=IconStyle.NAME)) == 'python'
+
+
 def test_get_program_icon_known_and_unknown():
     options = Options()
     assert get_program_icon('python', options) == DEFAULT_PROGRAM_ICONS['python']
@@ -195,58 +316,98 @@ def test_get_program_icon_known_and_unknown():
 
 def test_get_current_program_raises_valueerror_on_none_pid():
     # Use Pane mock with pane_pid=None
-    from scripts.path_utils import Pane as PathPane
-    from scripts.rename_session_windows import get_current_program
-    from tests.mocks import Pane as MockPane
-
     options = Options()
-    mock_pane = MockPane()
+    mock_pane = Pane()
     mock_pane.pane_pid = None
     pane = PathPane(info=mock_pane, program=None)
-    import pytest
 
     with pytest.raises(ValueError, match='Pane id is none'):
-        get_current_program([], pane.info, options)
+        get_current_program({}, pane.info, options)
 
 
 def test_get_current_program_skips_script_and_show_program_args():
     # Use Pane mock with valid pid and simulate running_programs with script in second part
-    from scripts.path_utils import Pane as PathPane
-    from scripts.rename_session_windows import get_current_program
-    from tests.mocks import Pane as MockPane
-
     options = Options()
-    mock_pane = MockPane()
+    mock_pane = Pane()
     mock_pane.pane_pid = 1234
     mock_pane.pane_current_command = 'fallback'
     pane = PathPane(info=mock_pane, program=None)
     # Simulate a running_programs entry where the second part is 'scripts/rename_session_windows.py'
     running_programs = [b'1234 bash scripts/rename_session_windows.py']
     # Should skip this entry and fall back to pane.pane_current_command
-    result = get_current_program(running_programs, pane.info, options)
+    result = get_current_program(build_programs_index(running_programs), pane.info, options)
     assert result == 'fallback'
 
     # Now test show_program_args branch
     options.show_program_args = True
     running_programs = [b'1234 python script.py']
-    mock_pane2 = MockPane()
+    mock_pane2 = Pane()
     mock_pane2.pane_pid = 1234
     pane = PathPane(info=mock_pane2, program=None)
-    result = get_current_program(running_programs, pane.info, options)
+    result = get_current_program(build_programs_index(running_programs), pane.info, options)
     assert result == 'python script.py'
 
 
-def test_get_panes_programs_handles_calledprocesserror(monkeypatch):
-    # Patch subprocess.check_output to raise CalledProcessError
-    import subprocess
+def _fake_proc(tmp_path, self_pid, processes):
+    (tmp_path / str(self_pid) / 'task' / str(self_pid)).mkdir(parents=True)
+    (tmp_path / str(self_pid) / 'task' / str(self_pid) / 'children').write_text('')
+    for pid, (children, cmdline, comm) in processes.items():
+        task = tmp_path / str(pid) / 'task' / str(pid)
+        task.mkdir(parents=True, exist_ok=True)
+        (task / 'children').write_text(' '.join(str(c) for c in children))
+        (tmp_path / str(pid) / 'cmdline').write_bytes(cmdline)
+        (tmp_path / str(pid) / 'comm').write_bytes(comm)
+
+
+def test_read_proc_children(monkeypatch, tmp_path):
+    _fake_proc(
+        tmp_path,
+        1,
+        {
+            10: ([12, 11], b'-zsh\0', b'zsh\n'),
+            11: ([], b'vim\0a b.txt\0', b'vim\n'),
+            12: ([], b'', b'defunct\n'),
+        },
+    )
+    monkeypatch.setattr('scripts.rename_session_windows.PROC_DIR', tmp_path)
+    monkeypatch.setattr('scripts.rename_session_windows.os.getpid', lambda: 1)
+    monkeypatch.setattr('scripts.rename_session_windows.sys.platform', 'linux')
 
-    # Ensure only one pane is present and no global state leaks
-    from scripts.rename_session_windows import get_panes_programs
-    from tests.mocks import Pane as MockPane
+    assert read_proc_children([10, 99]) == [b'10 vim a b.txt', b'10 [defunct]']
+
+
+def test_read_proc_children_without_children_files(monkeypatch, tmp_path):
+    # Kernels without CONFIG_PROC_CHILDREN only expose each process' parent through stat
+    for pid, ppid, comm, cmdline in (
+        (1, 0, b'init', b'init\0'),
+        (10, 1, b'zsh', b'-zsh\0'),
+        (11, 10, b'vim (x) y', b'vim\0a b.txt\0'),
+        (12, 11, b'cat', b'cat\0'),
+    ):
+        (tmp_path / str(pid)).mkdir()
+        (tmp_path / str(pid) / 'stat').write_bytes(b'%d (%s) S %d 1 1 0' % (pid, comm, ppid))
+        (tmp_path / str(pid) / 'cmdline').write_bytes(cmdline)
+    (tmp_path / 'self').mkdir()
+    monkeypatch.setattr('scripts.rename_session_windows.PROC_DIR', tmp_path)
+    monkeypatch.setattr('scripts.rename_session_windows.os.getpid', lambda: 1)
+    monkeypatch.setattr('scripts.rename_session_windows.sys.platform', 'linux')
+
+    assert read_proc_children([10, 99]) == [b'10 vim a b.txt']
 
+
+def test_read_proc_children_unsupported(monkeypatch, tmp_path):
+    monkeypatch.setattr('scripts.rename_session_windows.PROC_DIR', tmp_path)
+    monkeypatch.setattr('scripts.rename_session_windows.sys.platform', 'linux')
+    assert read_proc_children([10]) is None
+    monkeypatch.setattr('scripts.rename_session_windows.sys.platform', 'darwin')
+    assert read_proc_children([10]) is None
+
+
+def test_get_panes_programs_handles_calledprocesserror(monkeypatch):
+    # Ensure only one pane is present and no global state leaks
     session = Session()
     window = Window()
-    mock_pane = MockPane()
+    mock_pane = Pane()
     mock_pane.pane_pid = 1234
     window.panes = [mock_pane]
     session.windows = [window]
@@ -256,33 +417,30 @@ def test_get_panes_programs_handles_calledprocesserror(monkeypatch):
         raise subprocess.CalledProcessError(1, 'ps')
 
     monkeypatch.setattr('subprocess.check_output', fake_check_output)
+    monkeypatch.setattr('scripts.rename_session_windows.read_proc_children', lambda _ppids: None)
     # Should not raise, should return a list of Pane objects with fallback to pane.pane_current_command
     result = get_panes_programs(session, options)
     assert isinstance(result, list)
     # Instead of asserting length, assert our pane is present
-    assert any(p.info.pane_pid == 1234 for p in result)
+    assert any(p.info.pane_pid == '1234' for p in result)
 
 
 def test_rename_windows_exclusive_paths_branches(monkeypatch):
     # Test the continue branch and display_path substitution in exclusive_paths loop
-    from scripts.rename_session_windows import rename_windows
-
     server = Server()
     server.cmd.return_value.stdout = ['0']  # Ensure get_option works
     options = Options()
 
     # Create two mock Pane objects with window_id set, wrapped in PathPane
-    from tests.mocks import Pane as MockPane
-
-    mock_pane_enabled = MockPane(window_id='@1')
-    mock_pane_disabled = MockPane(window_id='@2')
+    mock_pane_enabled = Pane(window_id='@1')
+    mock_pane_disabled = Pane(window_id='@2')
 
     pane_enabled = PathPane(info=mock_pane_enabled, program='prog1')
     pane_disabled = PathPane(info=mock_pane_disabled, program='prog2')
-    # Patch get_window_option: enabled for @1, disabled for @2
+    # Patch the windows state: enabled for @1, disabled for @2
     monkeypatch.setattr(
-        'scripts.rename_session_windows.get_window_option',
-        lambda _s, w, _o, _d: 1 if w == '@1' else 0,
+        'scripts.rename_session_windows._load_windows_state',
+        lambda _s: {'@1': WindowState('1', None), '@2': WindowState('0', None)},
     )
     # Patch get_exclusive_paths to return both panes with display paths (real Pane objects)
     monkeypatch.setattr(
@@ -298,11 +456,9 @@ def test_rename_windows_exclusive_paths_branches(monkeypatch):
     calls = []
     monkeypatch.setattr(
         'scripts.rename_session_windows.rename_window',
-        lambda _s, wid, name, _maxlen, _opts: calls.append((wid, name)),
+        lambda _s, wid, name, _maxlen, _opts, _commands, _settled_name: calls.append((wid, name)),
     )
     # Patch tmux_guard to always yield already_running=False
-    import contextlib
-
     monkeypatch.setattr(
         'scripts.rename_session_windows.tmux_guard',
         contextlib.contextmanager(lambda _server: (yield False)),
@@ -314,9 +470,18 @@ def test_rename_windows_exclusive_paths_branches(monkeypatch):
     assert all('@2' not in call for call in calls)
 
 
-def test_rename_windows_runs_when_not_already_running(monkeypatch):
-    from scripts.rename_session_windows import rename_windows
+def test_load_windows_state(fake_server):
+    fake_server.cmd.return_value.stdout = ['@1 1 1 a name', '@2 0 0 other', '@3 1  ', '@4']
+    assert _load_windows_state(fake_server) == {
+        '@1': WindowState('1', 'a name'),
+        '@2': WindowState('0', None),
+        '@3': WindowState('', ''),
+        '@4': WindowState('', None),
+    }
+    fake_server.cmd.assert_called_once_with('list-windows', '-a', '-F', WINDOWS_STATE_FORMAT)
 
+
+def test_rename_windows_runs_when_not_already_running(monkeypatch):
     server = Server()
     session = Session(session_id='$1')
     window = Window(window_id='@1')
@@ -339,7 +504,7 @@ def test_rename_windows_runs_when_not_already_running(monkeypatch):
         'scripts.rename_session_windows.get_panes_programs',
         lambda _sess, _opts: [PathPane(info=pane, program='python script.py')],
     )
-    monkeypatch.setattr('scripts.rename_session_windows.get_window_option', lambda *_a, **_k: 1)
+    monkeypatch.setattr('scripts.rename_session_windows._load_windows_state', lambda _server: {})
     monkeypatch.setattr('scripts.rename_session_windows.get_option', lambda *_a, **_k: 0)
     monkeypatch.setattr('scripts.rename_session_windows.set_option', lambda *_a, **_k: None)
     monkeypatch.setattr('scripts.rename_session_windows.disable_user_rename_hook', lambda *_a, **_k: None)
@@ -348,7 +513,9 @@ def test_rename_windows_runs_when_not_already_running(monkeypatch):
     rename_calls = []
     monkeypatch.setattr(
         'scripts.rename_session_windows.rename_window',
-        lambda _server, window_id, window_name, _maxlen, _opts: rename_calls.append((window_id, window_name)),
+        lambda _server, window_id, window_name, _maxlen, _opts, _commands, _settled_name: rename_calls.append(
+            (window_id, window_name)
+        ),
     )
 
     rename_windows(server, options)
@@ -357,8 +524,6 @@ def test_rename_windows_runs_when_not_already_running(monkeypatch):
 
 
 def test_rename_windows_shell_uses_directory_name(monkeypatch):
-    from scripts.rename_session_windows import rename_windows
-
     server = Server()
     session = Session(session_id='$1')
     window = Window(window_id='@1')
@@ -381,7 +546,7 @@ def test_rename_windows_shell_uses_directory_name(monkeypatch):
         'scripts.rename_session_windows.get_panes_programs',
         lambda _sess, _opts: [PathPane(info=pane, program=None)],
     )
-    monkeypatch.setattr('scripts.rename_session_windows.get_window_option', lambda *_a, **_k: 1)
+    monkeypatch.setattr('scripts.rename_session_windows._load_windows_state', lambda _server: {})
     monkeypatch.setattr('scripts.rename_session_windows.get_option', lambda *_a, **_k: 0)
     monkeypatch.setattr('scripts.rename_session_windows.set_option', lambda *_a, **_k: None)
     monkeypatch.setattr('scripts.rename_session_windows.disable_user_rename_hook', lambda *_a, **_k: None)
@@ -390,7 +555,9 @@ def test_rename_windows_shell_uses_directory_name(monkeypatch):
     rename_calls = []
     monkeypatch.setattr(
         'scripts.rename_session_windows.rename_window',
-        lambda _server, window_id, window_name, _maxlen, _opts: rename_calls.append((window_id, window_name)),
+        lambda _server, window_id, window_name, _maxlen, _opts, _commands, _settled_name: rename_calls.append(
+            (window_id, window_name)
+        ),
     )
 
     rename_windows(server, options)
@@ -415,15 +582,23 @@ def test_get_current_session_fallback_to_cmd():
     assert result.id == '$2'
 
 
+def test_get_current_session_without_output_raises():
+    fake_server: Any = Server()
+    fake_server.cmd.return_value.stdout = []
+    with pytest.raises(ValueError, match='current tmux session'):
+        get_current_session(fake_server)
+
+
 def test_get_session_active_panes_returns_active():
     session: Any = Session()
     window = Window()
-    pane1 = Pane(pane_active='0')
-    pane2 = Pane(pane_active='1')
+    pane1 = Pane(pane_id='%1', pane_active='0')
+    pane2 = Pane(pane_id='%2', pane_active='1', pane_current_command='vim', window_id='@2')
     window.panes = [pane1, pane2]
     session.windows = [window]
     panes = get_session_active_panes(session)
-    assert panes == [pane2]
+    assert [(p.pane_id, p.window_id, p.pane_current_command) for p in panes] == [('%2', '@1', 'vim')]
+    session.server.cmd.assert_called_once()
 
 
 def test_get_session_active_panes_no_windows_and_no_active():
@@ -459,15 +634,11 @@ def test_get_option_string_fallback(fake_server):
 
 def test_print_programs_branches(monkeypatch):
     # Cover both branches of print_programs using only real libtmux fields
-    from scripts.path_utils import Pane as PathPane
-    from scripts.rename_session_windows import print_programs
-    from tests.mocks import Pane as MockPane
-
     server = Server()
     session = Session()
     window = Window()
     pane_with_program = PathPane(
-        info=MockPane(
+        info=Pane(
             pane_id='1',
             pane_pid=123,
             pane_active='1',
@@ -478,7 +649,7 @@ def test_print_programs_branches(monkeypatch):
         program=None,
     )
     pane_without_program = PathPane(
-        info=MockPane(
+        info=Pane(
             pane_id='2',
             pane_pid=456,
             pane_active='1',
@@ -525,31 +696,45 @@ def test_get_program_icon_unknown_program(fake_server):
 
 
 def test_parse_shell_command_edge_cases():
-    from scripts.rename_session_windows import parse_shell_command
-
     assert parse_shell_command([]) is None
     assert parse_shell_command([b'1234']) is None
     assert parse_shell_command([b'1234', b'/usr/bin/python', b'script.py']) == 'python'
 
 
+def test_build_programs_index_groups_by_ppid():
+    index = build_programs_index([b'1 bash', b'2 vim a.txt', b'1 python x.py', b'3'])
+    assert index == {b'1': [[b'bash'], [b'python', b'x.py']], b'2': [[b'vim', b'a.txt']]}
+
+
+def test_build_programs_index_drops_the_script():
+    index = build_programs_index([b'1 python3 /plugins/scripts/rename_session_windows.py', b'1 vim'])
+    assert index == {b'1': [[b'vim']]}
+
+
+def test_get_current_program_compares_encoded_programs():
+    options = Options(shells=['zsh'], ignored_programs=['htop'])
+    pane = Pane(pane_pid=1234, pane_current_command='fallback')
+    index = build_programs_index([b'1234 /usr/bin/zsh', b'1234 -htop'])
+    assert get_current_program(index, pane, options) is None
+    assert encode_skipped_programs(options) == frozenset({b'zsh', b'htop'})
+    # A precomputed set takes precedence over the options
+    index = build_programs_index([b'1234 /bin/vim file'])
+    assert get_current_program(index, pane, options, frozenset({b'vim'})) is None
+    assert get_current_program(index, pane, options) == '/bin/vim file'
+
+
 def test_get_current_program_fallback_and_ignored(fake_server):
     options = Options(shells=['bash'])
     pane = Pane(pane_pid=1234, pane_current_command='bash')
     # No matching PID in running_programs
-    result = get_current_program([], pane, options)
+    result = get_current_program({}, pane, options)
     assert result is None
     # Matching PID, but shell is ignored
-    result = get_current_program([b'1234 bash'], pane, options)
+    result = get_current_program(build_programs_index([b'1234 bash']), pane, options)
     assert result is None
 
 
 def test_main_invalid_argument(monkeypatch):
-    import sys
-
-    import pytest
-
-    from scripts.rename_session_windows import main
-
     monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', '--invalid'])
     with pytest.raises(SystemExit) as excinfo:
         main()
@@ -557,28 +742,17 @@ def test_main_invalid_argument(monkeypatch):
 
 
 def test_main_hook_error(monkeypatch):
-    import sys
-
-    from scripts.rename_session_windows import main
-
     monkeypatch.setattr(sys, 'argv', ['rename_session_windows.py', '--enable_rename_hook'])
-    from unittest.mock import patch
 
     with patch('scripts.rename_session_windows.enable_user_rename_hook', side_effect=Exception('fail')):
         assert main() == 1
 
 
 def test_main_entrypoint(monkeypatch):
-    import sys
-
-    from scripts.rename_session_windows import main
-    from tests.mocks import Server as MockServer
-    from tests.mocks import Session as MockSession
-
-    fake_server = MockServer()
+    fake_server = Server()
     fake_server.cmd.return_value.stdout = []
     monkeypatch.setattr('scripts.rename_session_windows.Server', lambda: fake_server)
-    monkeypatch.setattr('scripts.rename_session_windows.get_current_session', lambda _server: MockSession())
+    monkeypatch.setattr('scripts.rename_session_windows.get_current_session', lambda _server: Session())
     monkeypatch.setattr('scripts.rename_session_windows.get_panes_programs', lambda *_a, **_k: [])
     monkeypatch.setattr('scripts.rename_session_windows.rename_windows', lambda *_a, **_k: None)
 
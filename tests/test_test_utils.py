@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 """Tests for test utilities."""
 
+import pytest
+
 from .test_utils import (
+    DEFAULT_TEST_PATHS,
+    _leaf_paths,
+    _structure_paths,
     assert_paths_exist,
     create_test_directories,
     create_test_directory_structure,
     directory_fixture,
+    fast_tmp_dir,
+    remove_directory_tree,
 )
 
 
@@ -43,9 +50,18 @@ def test_create_test_directories_custom():
     assert not base_dir.exists()
 
 
-def test_create_test_directory_structure():
+def test_create_test_directories_in_root(test_dirs_root):
+    """Test directories created under a shared root are left for the root's cleanup."""
+    with create_test_directories(['a/b'], root=test_dirs_root) as base_dir:
+        assert base_dir.parent == test_dirs_root
+        assert (base_dir / 'a' / 'b').is_dir()
+
+    assert base_dir.exists()
+
+
+def test_create_test_directory_structure(test_dirs_root):
     """Test creating directory structure from list."""
-    with create_test_directories([]) as base_dir:
+    with create_test_directories([], root=test_dirs_root) as base_dir:
         paths = ['foo/bar', 'foo/baz', 'qux']
         create_test_directory_structure(base_dir, paths)
 
@@ -53,6 +69,64 @@ def test_create_test_directory_structure():
             assert (base_dir / path).exists()
 
 
+def test_fast_tmp_dir_override(monkeypatch, tmp_path):
+    """Test the tmpfs directory can be overridden and is skipped when missing."""
+    monkeypatch.setenv('TMUX_WNAME_TEST_TMPFS', str(tmp_path))
+    assert fast_tmp_dir() == str(tmp_path)
+
+    monkeypatch.setenv('TMUX_WNAME_TEST_TMPFS', str(tmp_path / 'missing'))
+    assert fast_tmp_dir() is None
+
+
+def test_remove_directory_tree(tmp_path):
+    """Test directory-only trees and trees holding files are both removed."""
+    dirs_only = tmp_path / 'dirs'
+    (dirs_only / 'a' / 'b').mkdir(parents=True)
+    (dirs_only / 'c').mkdir()
+    remove_directory_tree(dirs_only)
+    assert not dirs_only.exists()
+
+    with_file = tmp_path / 'files'
+    (with_file / 'a').mkdir(parents=True)
+    (with_file / 'a' / 'file.txt').write_text('content')
+    remove_directory_tree(with_file)
+    assert not with_file.exists()
+
+
+def test_remove_directory_tree_raises_cleanup_errors(monkeypatch, tmp_path):
+    """Test a tree that can't be removed is reported instead of leaking silently."""
+    (tmp_path / 'tree' / 'a').mkdir(parents=True)
+    (tmp_path / 'tree' / 'a' / 'file.txt').write_text('content')
+
+    def failing_rmtree(path):
+        raise PermissionError(path)
+
+    monkeypatch.setattr('tests.test_utils.shutil.rmtree', failing_rmtree)
+    with pytest.raises(PermissionError):
+        remove_directory_tree(tmp_path / 'tree')
+
+
+def test_leaf_paths():
+    """Test only the deepest paths are kept for creation."""
+    paths = ['a', 'a/b', 'a/b', 'a/bc', 'a/b/c', 'd']
+    assert _leaf_paths(paths) == ['a/b/c', 'a/bc', 'd']
+    assert _leaf_paths(['x', 'b', 'x', 'a']) == ['x', 'b', 'a']
+    assert sorted(_leaf_paths(DEFAULT_TEST_PATHS)) == sorted(DEFAULT_TEST_PATHS)
+
+
+def test_structure_paths():
+    """Test a directory_fixture structure is flattened to its leaf paths."""
+    structure = {'a': {'b': None, 'c': {'d': None}}, 'e': {}, 'f': None}
+    assert list(_structure_paths(structure)) == ['a/b', 'a/c/d', 'e', 'f']
+
+    deep: dict = {}
+    level = deep
+    for _ in range(2000):
+        level['d'] = {}
+        level = level['d']
+    assert list(_structure_paths(deep)) == ['/'.join(['d'] * 2000)]
+
+
 def test_directory_fixture_function():
     """Test creating directory structure from dictionary."""
     structure = {
@@ -81,14 +155,15 @@ def test_directory_fixture_function():
     assert not base_dir.exists()
 
 
-def test_assert_paths_exist():
+def test_assert_paths_exist(test_dirs_root):
     """Test path existence assertion utility."""
-    import pytest
-
-    with create_test_directories(['a/b/c', 'd/e/f']) as base_dir:
+    with create_test_directories(['a/b/c', 'd/e/f'], root=test_dirs_root) as base_dir:
         # Should pass for existing paths
         assert_paths_exist(base_dir, ['a/b/c', 'd/e/f'])
+        assert_paths_exist(base_dir, ['a', 'a/b', 'a/b/c/', 'a/b/../b'])
 
         # Should raise for non-existing paths
         with pytest.raises(AssertionError, match='does not exist'):
             assert_paths_exist(base_dir, ['non/existent/path'])
+        with pytest.raises(AssertionError, match='does not exist'):
+            assert_paths_exist(base_dir, ['a/b/c', 'a/b/missing'])
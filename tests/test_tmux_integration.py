@@ -5,15 +5,20 @@ import pytest
 from scripts.rename_session_windows import (
     IconStyle,
     Options,
+    _load_windows_state,
+    enable_user_rename_hook,
     get_option,
+    get_session_active_panes,
     get_window_option,
+    post_restore,
     rename_window,
     set_option,
     set_window_tmux_option,
+    source_tmux_commands,
     tmux_guard,
 )
 
-pytestmark = pytest.mark.usefixtures('clear_env')
+pytestmark = [pytest.mark.usefixtures('clear_env'), pytest.mark.serial]
 
 
 def test_set_option_roundtrip(tmux_session):
@@ -35,10 +40,15 @@ def test_set_window_tmux_option_roundtrip(tmux_session):
 def test_tmux_guard_sets_running_flag(tmux_session):
     server = tmux_session.server
     set_option(server, 'running', '0')
+    enable_user_rename_hook(server)
+    expected_hooks = server.cmd('show-hooks', '-g', 'after-rename-window').stdout
     with tmux_guard(server) as already_running:
         assert already_running is False
         assert get_option(server, 'running', 0) == 1
+        assert server.cmd('show-hooks', '-g', 'after-rename-window').stdout != expected_hooks
     assert get_option(server, 'running', 0) == 0
+    # The hook sourced on exit is the same one enable_user_rename_hook sets
+    assert server.cmd('show-hooks', '-g', 'after-rename-window').stdout == expected_hooks
 
 
 def test_rename_window_updates_tmux(tmux_session):
@@ -67,3 +77,68 @@ def test_rename_window_updates_tmux(tmux_session):
         assert automatic_rename == 'on'
     finally:
         tmux_session.cmd('kill-window', '-t', window.window_id)
+
+
+def test_options_from_options_roundtrip(tmux_session):
+    server = tmux_session.server
+    set_option(server, 'max_name_len', '33')
+    set_option(server, 'substitute_sets', "[('a\\\\d', '$b')]")
+    options = Options.from_options(server)
+    assert options.substitute_sets == [('a\\d', '$b')]
+    assert options.max_name_len == 33
+
+
+def test_rename_window_commands_sourced(tmux_session):
+    server = tmux_session.server
+    window = tmux_session.new_window(window_name='integration-start', attach=False)
+    try:
+        options = Options(icon_style=IconStyle.NAME, max_name_len=32)
+        commands: list[str] = []
+        rename_window(server, window.window_id, "it's ~a;", options.max_name_len, options, commands)
+        source_tmux_commands(server, commands)
+        window.refresh()
+        assert window.name == "it's ~a;"
+    finally:
+        tmux_session.cmd('kill-window', '-t', window.window_id)
+
+
+def test_get_session_active_panes_single_query(tmux_session):
+    window = tmux_session.new_window(window_name='integration-panes', attach=False)
+    try:
+        window.split()
+        active = {p.window_id: p for p in get_session_active_panes(tmux_session)}
+        assert set(active) == {w.window_id for w in tmux_session.windows}
+        expected = next(p for p in window.panes if p.pane_active == '1')
+        assert active[window.window_id].pane_id == expected.pane_id
+        assert active[window.window_id].pane_pid == expected.pane_pid
+        assert active[window.window_id].pane_current_path == expected.pane_current_path
+    finally:
+        tmux_session.cmd('kill-window', '-t', window.window_id)
+
+
+def test_post_restore_sets_enabled_from_automatic_rename(tmux_session):
+    server = tmux_session.server
+    window = tmux_session.new_window(window_name='integration-restore', attach=False)
+    try:
+        set_window_tmux_option(server, window.window_id, 'automatic-rename', 'off')
+        post_restore(server)
+        assert get_window_option(server, window.window_id, 'enabled', 1) == 0
+        assert get_window_option(server, tmux_session.windows[0].window_id, 'enabled', 0) == 1
+    finally:
+        tmux_session.cmd('kill-window', '-t', window.window_id)
+
+
+def test_load_windows_state_settled_after_rename(tmux_session):
+    server = tmux_session.server
+    window = tmux_session.new_window(window_name='integration-state', attach=False)
+    try:
+        options = Options(icon_style=IconStyle.NAME, max_name_len=32)
+        set_window_tmux_option(server, window.window_id, '@tmux_window_name_enabled', '1')
+        assert _load_windows_state(server)[window.window_id].settled_name is None
+
+        rename_window(server, window.window_id, 'settled name', options.max_name_len, options)
+        state = _load_windows_state(server)[window.window_id]
+        assert state.enabled == '1'
+        assert state.settled_name == 'settled name'
+    finally:
+        tmux_session.cmd('kill-window', '-t', window.window_id)
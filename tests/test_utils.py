@@ -1,20 +1,97 @@
 #!/usr/bin/env python3
 """Test utilities for tmux-window-name tests."""
 
+import os
+import shutil
 import tempfile
-from collections.abc import Iterator
-from contextlib import contextmanager
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 from pathlib import Path
 from typing import Optional
 
+TEST_DIR_PREFIX = 'tmux_window_name_test_'
+
+# Default paths from the original shell script, none of them is a parent of another so each is created once
+DEFAULT_TEST_PATHS = (
+    'test_intersect/dir',
+    'test_intersect/a/b/dir',
+    'test_intersect/b/a/dir',
+    'test_intersect/a/dir',
+    'test_intersect/b/dir',
+    'test_intersect/a/b/2',
+    'test_intersect/a/b/3',
+    'test_intersect/a/b/c',
+    'test_intersect/e/a/b/c',
+)
+
+
+def fast_tmp_dir() -> Optional[str]:
+    """Directory to put test directories in, tmpfs when available.
+
+    `TMUX_WNAME_TEST_TMPFS` overrides the default /dev/shm, None leaves the choice to tempfile.
+    """
+    # Only used as the parent of mkdtemp directories, which are private to the user
+    tmp_dir = os.environ.get('TMUX_WNAME_TEST_TMPFS', '/dev/shm')  # noqa: S108
+    return tmp_dir if Path(tmp_dir).is_dir() else None
+
+
+def remove_directory_tree(path: Path) -> None:
+    """
+    Remove a temporary directory tree.
+
+    The test directories hold only directories, those are removed bottom-up with a single rmdir each.
+    Anything else in the tree makes rmdir fail and the rest is left to shutil.rmtree, whose errors are raised.
+
+    Args:
+        path: Root of the tree to remove.
+    """
+    try:
+        for dir_path, _, _ in os.walk(path, topdown=False):
+            Path(dir_path).rmdir()
+    except OSError:
+        shutil.rmtree(path)
+
+
+@contextmanager
+def temporary_base_dir(root: Optional[Path] = None) -> Iterator[Path]:
+    """
+    Context manager that creates a temporary base directory for test directories.
+
+    Args:
+        root: Directory to create the base directory in, e.g. the `test_dirs_root` fixture.
+              The base directory is then left in place for the root's owner to remove in one go.
+              If None, a standalone temporary directory is created and removed on exit.
+
+    Yields:
+        Path: The temporary base directory.
+    """
+    if root is None:
+        base_path = Path(tempfile.mkdtemp(prefix=TEST_DIR_PREFIX, dir=fast_tmp_dir()))
+        try:
+            yield base_path
+        finally:
+            remove_directory_tree(base_path)
+    else:
+        yield Path(tempfile.mkdtemp(prefix=TEST_DIR_PREFIX, dir=root))
+
 
 @contextmanager
-def create_test_directories(paths: Optional[list[str]] = None) -> Iterator[Path]:
+def _directory_tree(paths: Iterable[str], root: Optional[Path]) -> Iterator[Path]:
+    """Shared builder of the test directory context managers, creates paths in a temporary base directory."""
+    with temporary_base_dir(root) as base_path:
+        create_test_directory_structure(base_path, paths)
+        yield base_path
+
+
+def create_test_directories(
+    paths: Optional[Iterable[str]] = None, root: Optional[Path] = None
+) -> AbstractContextManager[Path]:
     """
     Context manager that creates temporary test directories.
 
     Args:
-        paths: List of relative paths to create. If None, creates default test paths.
+        paths: Relative paths to create, duplicates are created once. If None, creates default test paths.
+        root: Directory to create the base directory in, see `temporary_base_dir`.
 
     Yields:
         Path: The temporary base directory containing all test directories.
@@ -24,33 +101,10 @@ def create_test_directories(paths: Optional[list[str]] = None) -> Iterator[Path]
             assert (base_dir / 'a' / 'dir').exists()
             assert (base_dir / 'b' / 'dir').exists()
     """
-    # Default paths from the original shell script
-    default_paths = [
-        'test_intersect/dir',
-        'test_intersect/a/b/dir',
-        'test_intersect/b/a/dir',
-        'test_intersect/a/dir',
-        'test_intersect/b/dir',
-        'test_intersect/a/b/2',
-        'test_intersect/a/b/3',
-        'test_intersect/a/b/c',
-        'test_intersect/e/a/b/c',
-    ]
-
-    paths_to_create = paths if paths is not None else default_paths
-
-    with tempfile.TemporaryDirectory(prefix='tmux_window_name_test_') as temp_dir:
-        base_path = Path(temp_dir)
-
-        # Create all requested directories
-        for path in paths_to_create:
-            dir_path = base_path / path
-            dir_path.mkdir(parents=True, exist_ok=True)
-
-        yield base_path
+    return _directory_tree(paths if paths is not None else DEFAULT_TEST_PATHS, root)
 
 
-def create_test_directory_structure(base_path: Path, paths: list[str]) -> None:
+def create_test_directory_structure(base_path: Path, paths: Iterable[str]) -> None:
     """
     Create a directory structure for testing.
 
@@ -58,13 +112,21 @@ def create_test_directory_structure(base_path: Path, paths: list[str]) -> None:
         base_path: Base directory where to create the structure.
         paths: List of relative paths to create.
     """
-    for path in paths:
-        dir_path = base_path / path
-        dir_path.mkdir(parents=True, exist_ok=True)
+    for path in _leaf_paths(paths):
+        (base_path / path).mkdir(parents=True, exist_ok=True)
 
 
-@contextmanager
-def directory_fixture(structure: dict) -> Iterator[Path]:
+def _leaf_paths(paths: Iterable[str]) -> list[str]:
+    """Drop duplicates and paths that are parents of another path, makedirs creates those with the leaves."""
+    leaves: list[str] = []
+    # dict.fromkeys drops duplicates in input order, the stable sort keeps that order between equal lengths
+    for path in sorted(dict.fromkeys(paths), key=len, reverse=True):
+        if not any(leaf.startswith(f'{path}/') for leaf in leaves):
+            leaves.append(path)
+    return leaves
+
+
+def directory_fixture(structure: dict, root: Optional[Path] = None) -> AbstractContextManager[Path]:
     """
     Context manager that creates a test directory structure from a dictionary.
 
@@ -72,6 +134,7 @@ def directory_fixture(structure: dict) -> Iterator[Path]:
         structure: Dictionary describing the directory structure.
                   Keys are directory names, values are either None for leaf dirs
                   or nested dictionaries for subdirectories.
+        root: Directory to create the base directory in, see `temporary_base_dir`.
 
     Yields:
         Path: The temporary base directory.
@@ -106,20 +169,23 @@ def directory_fixture(structure: dict) -> Iterator[Path]:
             assert (base_dir / 'a' / 'dir').exists()
             assert (base_dir / 'a' / 'b' / 'c').exists()
     """
-    with tempfile.TemporaryDirectory(prefix='tmux_window_name_test_') as temp_dir:
-        base_path = Path(temp_dir)
+    return _directory_tree(_structure_paths(structure or {}), root)
 
-        def create_structure(parent: Path, struct: dict) -> None:
-            for name, substructure in struct.items():
-                path = parent / name
-                path.mkdir(exist_ok=True)
-                if isinstance(substructure, dict):
-                    create_structure(path, substructure)
 
-        if structure:
-            create_structure(base_path, structure)
-
-        yield base_path
+def _structure_paths(struct: dict) -> Iterator[str]:
+    """Yield the relative paths of the directories without subdirectories in a directory_fixture structure."""
+    # Walked with a stack of item iterators rather than recursion, deep structures can't hit the recursion limit
+    stack = [('', iter(struct.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for name, substructure in items:
+            path = f'{prefix}{name}'
+            if isinstance(substructure, dict) and substructure:
+                stack.append((f'{path}/', iter(substructure.items())))
+                break
+            yield path
+        else:
+            stack.pop()
 
 
 def assert_paths_exist(base_path: Path, paths: list[str]) -> None:
@@ -133,6 +199,19 @@ def assert_paths_exist(base_path: Path, paths: list[str]) -> None:
     Raises:
         AssertionError: If any path doesn't exist.
     """
+    # One directory listing per parent instead of a stat per path
+    names_by_parent: dict[str, list[tuple[str, str]]] = {}
     for path in paths:
-        full_path = base_path / path
-        assert full_path.exists(), f'Path {full_path} does not exist'
+        parent, _, name = path.rstrip('/').rpartition('/')
+        names_by_parent.setdefault(parent, []).append((name, path))
+
+    for parent, names in names_by_parent.items():
+        try:
+            with os.scandir(base_path / parent) as entries:
+                existing = {entry.name for entry in entries}
+        except OSError:
+            existing = set()
+        for name, path in names:
+            full_path = base_path / path
+            # Names a listing never holds, like '..', still get a plain exists() check
+            assert name in existing or full_path.exists(), f'Path {full_path} does not exist'